@@ -47,6 +47,10 @@ def create_app():
     from .routes import register_routes
     register_routes(app)
 
+    # Pay Google credential/token/discovery setup at boot, not on the first fetch
+    from .routes.gdoc.gdoc_routes import google_helper
+    google_helper.warm_up()
+
     # --- 404 fallback to React (useful for direct hits to nested routes) ---
     @app.errorhandler(404)
     def not_found(_e):
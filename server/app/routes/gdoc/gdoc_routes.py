@@ -1,14 +1,26 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from concurrent.futures import ThreadPoolExecutor
+import json
 import logging
+import os
+import re
+from server.app.services.google.DocumentCache import DocumentCache
 from server.app.services.google.GoogleServiceHelper import GoogleServiceHelper
 from server.app.utils.formatters.parsing import extract_doc_id
-from server.app.services.rest_api.interpret_page.main import interpret_page
+from server.app.services.rest_api.interpret_page.main import PARSER_VERSION, iter_interpret_page, iter_interpret_document
 
 routes = Blueprint("gdoc", __name__)
 log = logging.getLogger(__name__)
 
-# Reuse a single helper instance (cheap + avoids rebuilding clients repeatedly)
-google_helper = GoogleServiceHelper()
+# Reuse a single helper instance (cheap + avoids rebuilding clients repeatedly).
+# Cached renders/pages are keyed on the parser version, so a parser change is a cache miss.
+google_helper = GoogleServiceHelper(DocumentCache(version=PARSER_VERSION))
+
+_DOC_ID_RE = re.compile(r"^[a-zA-Z0-9-_]+$")
+_MAX_BATCH = 100
+_BATCH_WORKERS = int(os.getenv("GDOC_BATCH_WORKERS") or 8)
+# Default for racing the Docs API against the public export (per-request "race" overrides)
+_RACE_EXPORT = (os.getenv("GDOC_RACE_EXPORT") or "").strip().lower() in ("1", "true", "yes")
 
 @routes.route("/", methods=["GET"])
 def health():
@@ -18,18 +30,134 @@ def health():
         "service_account_configured": google_helper.is_configured,
     }), 200
 
+def _unreadable(doc_id: str):
+    return jsonify({
+        "error": "Unable to fetch document. Share with the service account or make it viewable by link.",
+        "docId": doc_id
+    }), 403
+
+def _resolve_doc_id(value: str) -> str:
+    """Accept either a Docs URL or a bare doc id."""
+    if "/" in value:
+        return extract_doc_id(value)
+    if not _DOC_ID_RE.match(value):
+        raise ValueError("Could not extract document ID from the provided value.")
+    return value
+
+def _open_service_account_pages(doc_id: str):
+    """(pages_iter, "service_account") from the page cache or Docs API JSON, else None."""
+    # Serve the interpreted pages for this revision from cache,
+    # or segment the Docs API JSON directly (no HTML round trip)
+    revision = google_helper.doc_revision(doc_id)
+    cached = google_helper.cache.get("pages", doc_id, revision) if revision else None
+    if cached is not None:
+        return iter([cached["globals"], *cached["pages"]]), "service_account"
+
+    doc = google_helper.fetch_doc_json(doc_id, revision) if revision else None
+    if doc is None:
+        return None
+    pages_iter = _cache_when_done(iter_interpret_document(doc), doc_id, doc.get("revisionId") or revision)
+    return pages_iter, "service_account"
+
+def _open_public_pages(doc_id: str):
+    """(pages_iter, "public") from the public HTML export, else None."""
+    html_str, source = google_helper.fetch_public_html(doc_id)
+    if html_str is None:
+        return None
+    return iter_interpret_page(html_str), source
+
+def _open_pages(doc_id: str, race: bool = _RACE_EXPORT):
+    """
+    Returns (pages_iter, source): globals first, then pages. pages_iter is None
+    when the doc can't be read by the service account or via the public export.
+
+    race=True starts the public export alongside the Docs API instead of after
+    it fails, and takes whichever readable source answers first.
+    """
+    if race:
+        opened = google_helper.first_result(
+            lambda: _open_service_account_pages(doc_id),
+            lambda: _open_public_pages(doc_id),
+        )
+    else:
+        opened = _open_service_account_pages(doc_id) or _open_public_pages(doc_id)
+    return opened or (None, None)
+
+def _collect_pages(pages_iter) -> dict:
+    globals_blk = next(pages_iter)
+    return {"globals": globals_blk, "pages": list(pages_iter)}
+
+def _fetch_one(value: str) -> dict:
+    """Batch worker: never raises, returns either a result or an error entry."""
+    out = {"input": value, "docId": None}
+    try:
+        out["docId"] = _resolve_doc_id(value)
+    except ValueError as e:
+        out["error"] = str(e)
+        return out
+
+    try:
+        pages_iter, source = _open_pages(out["docId"])
+        if pages_iter is None:
+            out["error"] = "Unable to fetch document. Share with the service account or make it viewable by link."
+            return out
+        out["source"] = source
+        out["content"] = _collect_pages(pages_iter)
+    except Exception as e:
+        log.exception("Batch fetch failed for %s", value)
+        out["error"] = str(e)
+    return out
+
+def _cache_when_done(pages_iter, doc_id: str, revision: str):
+    """Pass globals/pages through unchanged and cache the full result once the iterator is exhausted."""
+    globals_blk = next(pages_iter)
+    yield globals_blk
+    pages = []
+    for page in pages_iter:
+        pages.append(page)
+        yield page
+    google_helper.cache.set("pages", doc_id, revision, {"globals": globals_blk, "pages": pages})
+
+def _ndjson_line(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False) + "\n"
+
+def _stream_pages(doc_id: str, source: str, pages_iter):
+    """
+    NDJSON body: one {"type": "globals", ...} line, one {"type": "page", ...} line
+    per page as it is segmented, then {"type": "done", "pageCount": N}.
+    """
+    def generate():
+        count = 0
+        try:
+            globals_blk = next(pages_iter)
+            yield _ndjson_line({"type": "globals", "docId": doc_id, "source": source, "format": "html", "globals": globals_blk})
+            for page in pages_iter:
+                count += 1
+                yield _ndjson_line({"type": "page", "page": page})
+        except Exception as e:
+            log.exception("Streaming interpret failed for %s", doc_id)
+            yield _ndjson_line({"type": "error", "error": str(e), "docId": doc_id})
+            return
+        yield _ndjson_line({"type": "done", "pageCount": count})
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 @routes.route("/fetch", methods=["POST"])
 def fetch_google_doc():
     """
     Body: {
       "url": "https://docs.google.com/document/d/<id>/edit"   // or "doc_id"
       "format": "html" | "text"                                // optional; default "html"
+      "stream": true                                           // optional; html only -> NDJSON response
+      "race": true                                             // optional; race Docs API vs public export
     }
     """
     payload = request.get_json(silent=True) or {}
     url = (payload.get("url") or "").strip()
     doc_id = (payload.get("doc_id") or "").strip()
     fmt = (payload.get("format") or "html").lower()
+    stream = bool(payload.get("stream"))
+    race = bool(payload.get("race", _RACE_EXPORT))
 
     if not doc_id:
         if not url:
@@ -41,16 +169,51 @@ def fetch_google_doc():
 
     if fmt == "text":
         content, source = google_helper.fetch_doc_text(doc_id)
-    else:
-        content, source = google_helper.fetch_doc_html(doc_id)
-        content = interpret_page(content)
+        if content is None:
+            return _unreadable(doc_id)
+        return jsonify({"docId": doc_id, "source": source, "format": fmt, "content": content}), 200
 
-    if content is None:
-        return jsonify({
-            "error": "Unable to fetch document. Share with the service account or make it viewable by link.",
-            "docId": doc_id
-        }), 403
+    pages_iter, source = _open_pages(doc_id, race=race)
+    if pages_iter is None:
+        return _unreadable(doc_id)
 
+    if stream:
+        return _stream_pages(doc_id, source, pages_iter)
+
+    content = _collect_pages(pages_iter)
     return jsonify({"docId": doc_id, "source": source, "format": fmt, "content": content}), 200
 
+@routes.route("/fetch-batch", methods=["POST"])
+def fetch_google_doc_batch():
+    """
+    Body: {
+      "docs": ["https://docs.google.com/document/d/<id>/edit", "<doc_id>", ...]   // or "urls" / "doc_ids"
+    }
+    Docs are fetched and interpreted concurrently (GDOC_BATCH_WORKERS, default 8).
+
+    Returns (in input order):
+    {
+      "results": [ { "input": "...", "docId": "...", "source": "...", "content": {...} }, ... ],
+      "errors":  [ { "input": "...", "docId": "...", "error": "..." }, ... ]
+    }
+    """
+    payload = request.get_json(silent=True) or {}
+    inputs = []
+    for key in ("docs", "urls", "doc_ids"):
+        value = payload.get(key) or []
+        if not isinstance(value, list):
+            return jsonify({"error": f"'{key}' must be an array"}), 400
+        inputs.extend(str(v).strip() for v in value if str(v or "").strip())
+
+    if not inputs:
+        return jsonify({"error": "Provide a non-empty 'docs' array of URLs or doc ids"}), 400
+    if len(inputs) > _MAX_BATCH:
+        return jsonify({"error": f"At most {_MAX_BATCH} docs per batch"}), 400
+
+    workers = min(len(inputs), _BATCH_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(_fetch_one, inputs))
 
+    results = [o for o in outcomes if "error" not in o]
+    errors = [o for o in outcomes if "error" in o]
+    return jsonify({"results": results, "errors": errors}), 200
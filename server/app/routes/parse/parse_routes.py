@@ -1,14 +1,23 @@
 from flask import Blueprint, request, jsonify, Response
 import logging
+import os
 import re
 
 from server.app.services.rest_api.interpret_page.page_breakdown import breakdown_pages
 from server.app.services.rest_api.interpret_page.csv_conversion import convert_csv
+from server.app.services.rest_api.interpret_page.wxr_export import convert_wxr
+from server.app.services.rest_api.interpret_page.duplicates import find_duplicates, DEFAULT_THRESHOLD
+from server.app.services.rest_api.upload_page.upload_pages import prepare_uploads
 
 routes = Blueprint("parse", __name__)
 log = logging.getLogger(__name__)
 
 _SAFE_ID_RE = re.compile(r"^[a-z0-9_]+$")
+# Opt-in: start upload prep while the pages are on the review screen. Prep can
+# cost money (crypto_market_news/learn generates a paid DALL-E featured image
+# per page, and again for a re-parse with a changed heading) even if the pages
+# are never uploaded; without it the same work happens at upload time.
+_PREPARE_ON_PARSE = (os.getenv("PREPARE_UPLOADS_ON_PARSE") or "").strip().lower() in ("1", "true", "yes")
 
 def _err(msg, code=400):
     return jsonify({"error": msg}), code
@@ -20,7 +29,9 @@ def parse_pages():
     {
       "client_id": "georges_cameras",
       "globals": {...},                       # ignored here (optional)
-      "pages": [ { ... , "content_type": "...", "pageBody": "<h1>..</h1>" }, ... ]
+      "pages": [ { ... , "content_type": "...", "pageBody": "<h1>..</h1>" }, ... ],
+      "check_duplicates": true,               # optional: flag near-duplicate pages/FAQs
+      "duplicate_threshold": 0.92             # optional: cosine similarity cut-off
     }
     """
     try:
@@ -57,8 +68,24 @@ def parse_pages():
         # Hand off to breakdown_pages (only needs client_id & pages)
         results = breakdown_pages(client_id=client_id, pages=pages)
 
+        response = {"client_id": client_id, "globals": globals, "results": results.get('pages', []), "errors": results.get('errors', [])}
+
+        # Background only: hooks queue their jobs and return immediately
+        if _PREPARE_ON_PARSE and response["results"]:
+            prepare_uploads(client_id, response["results"])
+
+        # Near-duplicates within the brief and against previously uploaded content.
+        # Best effort: a failed check never fails the parse.
+        if payload.get("check_duplicates"):
+            try:
+                threshold = float(payload.get("duplicate_threshold") or DEFAULT_THRESHOLD)
+                response["duplicates"] = find_duplicates(client_id, response["results"], threshold=threshold)
+            except Exception as e:
+                log.exception("Duplicate check failed for %s", client_id)
+                response["duplicates"] = {"error": str(e)}
+
         # Return whatever breakdown returns (wrap with client_id for context)
-        return jsonify({"client_id": client_id, "globals": globals, "results": results.get('pages', []), "errors": results.get('errors', [])}), 200
+        return jsonify(response), 200
 
     except Exception as e:
         log.exception("parse_pages error")
@@ -75,4 +102,22 @@ def convert_json_to_csv():
         headers={
             "Content-Disposition": f'attachment; filename="{filename}"'
         },
-    )
\ No newline at end of file
+    )
+
+
+@routes.route("/wxr", methods=["POST"])
+def convert_json_to_wxr():
+    """
+    Same payload as /csv (optionally "status": "draft" | "publish" | ...).
+    Returns a WordPress WXR file for Tools > Import, so a whole brief goes
+    in as one server-side import instead of a REST request per page.
+    """
+    payload = request.get_json(silent=True) or {}
+    xml_text, filename = convert_wxr(payload)
+    return Response(
+        xml_text,
+        mimetype="application/rss+xml",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        },
+    )
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_DEFAULT_MAX_ENTRIES = 64
+_DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "streamline_gdoc_cache")
+_DEFAULT_MAX_MB = 256
+_DEFAULT_MAX_AGE_DAYS = 7
+# Sweep the disk tier for expired/excess files every N writes
+_PRUNE_EVERY = 32
+
+
+class DocumentCache:
+    """
+    Two-tier (memory LRU + on-disk JSON) cache for Google Doc renders, keyed by
+    (kind, doc_id) and tagged with the Docs API revisionId. A new revision simply
+    replaces the old entry, so the disk tier holds at most one file per doc/kind.
+
+    `version` identifies the code that produced the values (e.g. the parser);
+    disk entries written under another version are misses, so a deploy that
+    changes the output never serves stale renders. The disk tier is bounded by
+    age (entries expire) and total size (least recently used files go first),
+    swept at startup and every few writes.
+
+    Also provides single-flight loading so concurrent requests for the same key
+    share one upstream call.
+
+    Env:
+      GDOC_CACHE_SIZE      max in-memory entries (default 64)
+      GDOC_CACHE_DIR       on-disk location; set to "off" to disable the disk tier
+      GDOC_CACHE_MAX_MB    disk tier size cap (default 256)
+      GDOC_CACHE_MAX_DAYS  disk entry lifetime (default 7)
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, cache_dir: Optional[str] = None, version: str = ""):
+        if max_entries is None:
+            max_entries = int(os.getenv("GDOC_CACHE_SIZE") or _DEFAULT_MAX_ENTRIES)
+        if cache_dir is None:
+            cache_dir = os.getenv("GDOC_CACHE_DIR") or _DEFAULT_DIR
+        self.max_entries = max(1, max_entries)
+        self.cache_dir = None if cache_dir.lower() == "off" else cache_dir
+        self.version = version
+        self.max_bytes = int(float(os.getenv("GDOC_CACHE_MAX_MB") or _DEFAULT_MAX_MB) * 1024 * 1024)
+        self.max_age = float(os.getenv("GDOC_CACHE_MAX_DAYS") or _DEFAULT_MAX_AGE_DAYS) * 86400
+
+        self._mem: "OrderedDict[tuple, tuple]" = OrderedDict()  # (kind, doc_id) -> (revision, value)
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future
+        self._writes = 0
+        self._prune_lock = threading.Lock()
+        if self.cache_dir:
+            self._prune()
+
+    # ---------- PUBLIC API ----------
+    def get(self, kind: str, doc_id: str, revision: str) -> Optional[Any]:
+        key = (kind, doc_id)
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None and hit[0] == revision:
+                self._mem.move_to_end(key)
+                return hit[1]
+
+        value = self._disk_get(kind, doc_id, revision)
+        if value is not None:
+            self._mem_set(key, revision, value)
+        return value
+
+    def peek(self, kind: str, doc_id: str) -> Optional[Tuple[str, Any]]:
+        """Latest (revision, value) stored for this doc/kind, whatever its revision."""
+        key = (kind, doc_id)
+        with self._lock:
+            hit = self._mem.get(key)
+        if hit is not None:
+            return hit
+
+        entry = self._disk_read(kind, doc_id)
+        if not entry or not entry.get("revision"):
+            return None
+        self._mem_set(key, entry["revision"], entry.get("value"))
+        return entry["revision"], entry.get("value")
+
+    def set(self, kind: str, doc_id: str, revision: str, value: Any) -> None:
+        if not revision or value is None:
+            return
+        self._mem_set((kind, doc_id), revision, value)
+        self._disk_set(kind, doc_id, revision, value)
+
+    def get_or_load(self, kind: str, doc_id: str, revision: str, loader: Callable[[], Any]) -> Optional[Any]:
+        """Return the cached value for this revision, or run loader() once (coalesced) and cache it."""
+        value = self.get(kind, doc_id, revision)
+        if value is not None:
+            return value
+
+        def load():
+            loaded = loader()
+            self.set(kind, doc_id, revision, loaded)
+            return loaded
+
+        return self.single_flight((kind, doc_id, revision), load)
+
+    def single_flight(self, key: Any, fn: Callable[[], Any]) -> Any:
+        """Run fn() once per key at a time; concurrent callers wait for and share its result."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+
+        if not leader:
+            return fut.result()
+
+        try:
+            result = fn()
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    # ---------- INTERNAL: memory tier ----------
+    def _mem_set(self, key: tuple, revision: str, value: Any) -> None:
+        with self._lock:
+            self._mem[key] = (revision, value)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    # ---------- INTERNAL: disk tier ----------
+    def _path(self, kind: str, doc_id: str) -> str:
+        digest = hashlib.sha1(f"{kind}:{doc_id}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _disk_read(self, kind: str, doc_id: str) -> Optional[dict]:
+        if not self.cache_dir:
+            return None
+        path = self._path(kind, doc_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning("Unreadable gdoc cache entry for %s/%s: %s", kind, doc_id, e)
+            return None
+
+        if not isinstance(entry, dict) or entry.get("version") != self.version:
+            return None
+        if time.time() - (entry.get("savedAt") or 0) > self.max_age:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # mark as recently used for size eviction
+        except OSError:
+            pass
+        return entry
+
+    def _disk_get(self, kind: str, doc_id: str, revision: str) -> Optional[Any]:
+        entry = self._disk_read(kind, doc_id)
+        if not entry or entry.get("revision") != revision:
+            return None
+        return entry.get("value")
+
+    def _disk_set(self, kind: str, doc_id: str, revision: str, value: Any) -> None:
+        if not self.cache_dir:
+            return
+        tmp = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({
+                    "docId": doc_id,
+                    "kind": kind,
+                    "revision": revision,
+                    "version": self.version,
+                    "savedAt": time.time(),
+                    "value": value,
+                }, f, ensure_ascii=False)
+            os.replace(tmp, self._path(kind, doc_id))  # atomic swap so readers never see a partial file
+        except (OSError, TypeError, ValueError) as e:
+            log.warning("Failed to write gdoc cache entry for %s/%s: %s", kind, doc_id, e)
+            if tmp and os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % _PRUNE_EVERY == 0
+        if due:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Delete expired files, then least recently used ones until under the size cap."""
+        if not self._prune_lock.acquire(blocking=False):
+            return  # another thread is already sweeping
+        try:
+            try:
+                entries = [e for e in os.scandir(self.cache_dir) if e.is_file() and e.name.endswith((".json", ".tmp"))]
+            except FileNotFoundError:
+                return
+            now = time.time()
+            files, total = [], 0
+            for entry in entries:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                # mtime is the last write or hit; nothing older than max_age can still be valid
+                if now - st.st_mtime > self.max_age:
+                    self._remove(entry.path)
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+            if total > self.max_bytes:
+                for _, size, path in sorted(files):
+                    if total <= self.max_bytes:
+                        break
+                    if path.endswith(".tmp"):
+                        continue  # may be a write in progress
+                    self._remove(path)
+                    total -= size
+        finally:
+            self._prune_lock.release()
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
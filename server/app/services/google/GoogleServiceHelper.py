@@ -1,54 +1,150 @@
 import logging
-from typing import Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
+import httplib2
 from google.oauth2 import service_account
+from google.auth.transport.requests import Request as GoogleAuthRequest
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-import html
 
 from server.config.ConfigHelper import ConfigHelper
+from server.app.services.google.DocumentCache import DocumentCache
+from server.app.utils.formatters.docs_render import flatten_text, render_html
 
 log = logging.getLogger(__name__)
 _DOCS_SCOPE = ["https://www.googleapis.com/auth/documents.readonly"]
+_HTTP_TIMEOUT = 30
+# Partial response: only what render_html / _flatten_text / interpret_document read.
+# Skips inline objects, styles, named ranges, suggestions, headers/footers, tables.
+_DOC_FIELDS = (
+    "revisionId,lists,"
+    "body/content/paragraph("
+    "paragraphStyle/namedStyleType,"
+    "bullet(listId,nestingLevel),"
+    "elements/textRun(content,textStyle(bold,italic,underline,strikethrough,link/url))"
+    ")"
+)
+_EXPORT_URL = "https://docs.google.com/document/d/{doc_id}/export?format={fmt}"
+_EXPORT_TIMEOUT = 20
+_EXPORT_POOL_SIZE = 16
+_RACE_WORKERS = 16
+# Raw document dicts are only kept long enough for e.g. a text + html render of one revision
+_RAW_DOC_TTL = 60
+_RAW_DOC_MAX = 16
 
 
 class GoogleServiceHelper:
-    def __init__(self):
-        self._docs_client = None
+    def __init__(self, cache: Optional[DocumentCache] = None):
+        # One service-account credential (and token) shared by every thread...
+        self._credentials = None
+        self._creds_lock = threading.Lock()
+        # ...but one Docs client per thread: the httplib2 transport is not thread-safe
+        self._local = threading.local()
+        self.cache = cache or DocumentCache()
+        self._raw_docs = {}  # doc_id -> (fetched_at, revisionId, doc)
+        self._raw_lock = threading.Lock()
+        self._http = self._build_http_session()
+        self._race_pool = ThreadPoolExecutor(max_workers=_RACE_WORKERS, thread_name_prefix="gdoc-race")
+
+    @staticmethod
+    def _build_http_session() -> requests.Session:
+        """Keep-alive session for the public export path (one TLS handshake per pooled connection)."""
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=_EXPORT_POOL_SIZE))
+        return session
 
     @property
     def is_configured(self) -> bool:
         """Returns True if GOOGLE_DOC_SERVICE_ACCOUNT_CONFIG exists and is valid JSON."""
         return ConfigHelper.get_google_sa_json() is not None
 
-    def docs_client(self):
-        """Build and cache the Google Docs API client."""
-        if self._docs_client is not None:
-            return self._docs_client
+    def _get_credentials(self):
+        if self._credentials is not None:
+            return self._credentials
 
-        info = ConfigHelper.get_google_sa_json()
-        if not info:
-            log.info("Google Docs credentials not found in environment.")
-            return None
+        with self._creds_lock:
+            if self._credentials is None:
+                info = ConfigHelper.get_google_sa_json()
+                if not info:
+                    log.info("Google Docs credentials not found in environment.")
+                    return None
+                try:
+                    self._credentials = service_account.Credentials.from_service_account_info(
+                        info, scopes=_DOCS_SCOPE
+                    )
+                except Exception as e:
+                    log.error("Failed to create service account credentials: %s", e)
+                    return None
+        return self._credentials
+
+    def _ensure_token(self, creds) -> bool:
+        """Refresh the shared access token once (under the lock) rather than racing in every thread."""
+        if creds.valid:
+            return True
+        with self._creds_lock:
+            if creds.valid:
+                return True
+            try:
+                creds.refresh(GoogleAuthRequest())
+            except Exception as e:
+                log.error("Failed to refresh service account token: %s", e)
+                return False
+        return True
 
-        try:
-            creds = service_account.Credentials.from_service_account_info(
-                info, scopes=_DOCS_SCOPE
-            )
-        except Exception as e:
-            log.error("Failed to create service account credentials: %s", e)
+    def docs_client(self):
+        """Return this thread's Google Docs API client (built on first use)."""
+        creds = self._get_credentials()
+        if creds is None or not self._ensure_token(creds):
             return None
 
-        self._docs_client = build(
-            "docs", "v1", credentials=creds, cache_discovery=False
-        )
-        return self._docs_client
+        client = getattr(self._local, "docs_client", None)
+        if client is None:
+            http = AuthorizedHttp(creds, http=httplib2.Http(timeout=_HTTP_TIMEOUT))
+            client = build("docs", "v1", http=http, cache_discovery=False, static_discovery=True)
+            self._local.docs_client = client
+        return client
+
+    def warm_up(self) -> bool:
+        """
+        Build the credential, fetch a token and load the (static) discovery doc
+        ahead of the first request. Safe to call when no service account is set.
+        """
+        if not self.is_configured:
+            return False
+        ok = self.docs_client() is not None
+        log.info("Google Docs client warm-up %s", "complete" if ok else "failed")
+        return ok
 
     # ---------- PUBLIC API ----------
+    def doc_revision(self, doc_id: str) -> Optional[str]:
+        """
+        Cheap revision check (fields=revisionId). None when there is no service
+        account or it can't read the doc, in which case the full Docs API fetch
+        would fail too and callers can go straight to the public export.
+        """
+        client = self.docs_client()
+        if not client:
+            return None
+        try:
+            meta = client.documents().get(documentId=doc_id, fields="revisionId").execute()
+            return meta.get("revisionId")
+        except HttpError as e:
+            log.info("Docs API revision check failed for %s: %s", doc_id, e)
+        except Exception as e:
+            log.exception("Unexpected Docs API error checking revision of %s: %s", doc_id, e)
+        return None
+
     def fetch_doc_text(self, doc_id: str) -> Tuple[Optional[str], Optional[str]]:
-        text = self._try_docs_api_text(doc_id)
-        if text:
-            return text, "service_account"
+        revision = self.doc_revision(doc_id)
+        if revision:
+            text = self.cache.get_or_load("text", doc_id, revision, lambda: self._try_docs_api_text(doc_id, revision))
+            if text:
+                return text, "service_account"
 
         text = self._try_public_export_text(doc_id)
         if text:
@@ -57,9 +153,11 @@ class GoogleServiceHelper:
         return None, None
 
     def fetch_doc_html(self, doc_id: str) -> Tuple[Optional[str], Optional[str]]:
-        html_str = self._try_docs_api_html(doc_id)
-        if html_str:
-            return html_str, "service_account"
+        revision = self.doc_revision(doc_id)
+        if revision:
+            html_str = self.cache.get_or_load("html", doc_id, revision, lambda: self._try_docs_api_html(doc_id, revision))
+            if html_str:
+                return html_str, "service_account"
 
         html_str = self._try_public_export_html(doc_id)
         if html_str:
@@ -67,191 +165,139 @@ class GoogleServiceHelper:
 
         return None, None
 
-    # ---------- INTERNAL: Docs API renders ----------
-    def _try_docs_api_text(self, doc_id: str) -> Optional[str]:
-        client = self.docs_client()
-        if not client:
-            return None
-        try:
-            doc = client.documents().get(documentId=doc_id).execute()
-            return self._flatten_text(doc)
-        except HttpError as e:
-            log.warning("Docs API error for %s: %s", doc_id, e)
-        except Exception as e:
-            log.exception("Unexpected Docs API error for %s: %s", doc_id, e)
+    def fetch_doc_json(self, doc_id: str, revision: Optional[str] = None) -> Optional[dict]:
+        """Raw (field-masked) Docs API document, service account only; None if unavailable."""
+        return self._try_docs_api_doc(doc_id, revision)
+
+    def first_result(self, *loaders: Callable[[], Any]) -> Any:
+        """
+        Run loaders concurrently and return the first non-None result (None if
+        every loader comes back empty). Slower loaders finish in the background.
+        """
+        futures = [self._race_pool.submit(fn) for fn in loaders]
+        for fut in as_completed(futures):
+            try:
+                result = fut.result()
+            except Exception as e:
+                log.warning("Raced loader failed: %s", e)
+                continue
+            if result is not None:
+                return result
         return None
 
-    def _try_docs_api_html(self, doc_id: str) -> Optional[str]:
+    def fetch_public_html(self, doc_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """Public HTML export only, for callers that already tried the Docs API."""
+        html_str = self._try_public_export_html(doc_id)
+        if html_str:
+            return html_str, "public"
+        return None, None
+
+    # ---------- INTERNAL: Docs API renders ----------
+    def _try_docs_api_doc(self, doc_id: str, revision: Optional[str] = None) -> Optional[dict]:
+        doc = self._raw_doc_get(doc_id, revision)
+        if doc is not None:
+            return doc
+
         client = self.docs_client()
         if not client:
             return None
+        # Concurrent fetches of the same doc share one upstream call
+        doc = self.cache.single_flight(("doc", doc_id), lambda: self._get_doc(client, doc_id))
+        if doc is not None:
+            self._raw_doc_set(doc_id, doc)
+        return doc
+
+    def _raw_doc_get(self, doc_id: str, revision: Optional[str]) -> Optional[dict]:
+        with self._raw_lock:
+            entry = self._raw_docs.get(doc_id)
+        if entry is None:
+            return None
+        fetched_at, rev, doc = entry
+        if time.monotonic() - fetched_at > _RAW_DOC_TTL or (revision and rev != revision):
+            return None
+        return doc
+
+    def _raw_doc_set(self, doc_id: str, doc: dict) -> None:
+        now = time.monotonic()
+        with self._raw_lock:
+            self._raw_docs[doc_id] = (now, doc.get("revisionId"), doc)
+            # drop expired entries, then the oldest if still over the cap
+            for key in [k for k, v in self._raw_docs.items() if now - v[0] > _RAW_DOC_TTL]:
+                del self._raw_docs[key]
+            while len(self._raw_docs) > _RAW_DOC_MAX:
+                oldest = min(self._raw_docs, key=lambda k: self._raw_docs[k][0])
+                del self._raw_docs[oldest]
+
+    @staticmethod
+    def _get_doc(client, doc_id: str) -> Optional[dict]:
         try:
-            doc = client.documents().get(documentId=doc_id).execute()
-            return self._render_html(doc)
+            return client.documents().get(documentId=doc_id, fields=_DOC_FIELDS).execute()
         except HttpError as e:
             log.warning("Docs API error for %s: %s", doc_id, e)
         except Exception as e:
             log.exception("Unexpected Docs API error for %s: %s", doc_id, e)
         return None
 
+    def _try_docs_api_text(self, doc_id: str, revision: Optional[str] = None) -> Optional[str]:
+        doc = self._try_docs_api_doc(doc_id, revision)
+        return self._flatten_text(doc) if doc else None
+
+    def _try_docs_api_html(self, doc_id: str, revision: Optional[str] = None) -> Optional[str]:
+        doc = self._try_docs_api_doc(doc_id, revision)
+        return self.render_html(doc) if doc else None
+
     # ---------- INTERNAL: Public export fallbacks ----------
-    @staticmethod
-    def _try_public_export_text(doc_id: str) -> Optional[str]:
-        url = f"https://docs.google.com/document/d/{doc_id}/export?format=txt"
-        try:
-            r = requests.get(url, timeout=20)
-            if r.status_code == 200 and r.text.strip():
-                return r.text.strip()
-        except requests.RequestException as e:
-            log.warning("Public export (txt) failed for %s: %s", doc_id, e)
-        return None
+    def _try_public_export_text(self, doc_id: str) -> Optional[str]:
+        text = self._public_export(doc_id, "txt")
+        return text.strip() if text and text.strip() else None
+
+    def _try_public_export_html(self, doc_id: str) -> Optional[str]:
+        html_str = self._public_export(doc_id, "html")
+        return html_str if html_str and html_str.strip() else None
+
+    def _public_export(self, doc_id: str, fmt: str) -> Optional[str]:
+        """
+        GET the public export over the pooled keep-alive session. If we hold an
+        earlier export with validators, ask conditionally and reuse it on 304.
+        """
+        kind = f"export_{fmt}"
+        url = _EXPORT_URL.format(doc_id=doc_id, fmt=fmt)
+
+        cached = self.cache.peek(kind, doc_id)
+        previous = cached[1] if cached else None
+        headers = {}
+        if previous:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("lastModified"):
+                headers["If-Modified-Since"] = previous["lastModified"]
 
-    @staticmethod
-    def _try_public_export_html(doc_id: str) -> Optional[str]:
-        url = f"https://docs.google.com/document/d/{doc_id}/export?format=html"
         try:
-            r = requests.get(url, timeout=20)
-            if r.status_code == 200 and r.text.strip():
-                return r.text
+            r = self._http.get(url, headers=headers, timeout=_EXPORT_TIMEOUT)
         except requests.RequestException as e:
-            log.warning("Public export (html) failed for %s: %s", doc_id, e)
-        return None
+            log.warning("Public export (%s) failed for %s: %s", fmt, doc_id, e)
+            return None
+
+        if r.status_code == 304 and previous:
+            return previous.get("body")
+        if r.status_code != 200 or not r.text.strip():
+            return None
+
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.cache.set(kind, doc_id, etag or last_modified, {
+                "etag": etag,
+                "lastModified": last_modified,
+                "body": r.text,
+            })
+        return r.text
 
     # ---------- RENDERERS ----------
     @staticmethod
     def _flatten_text(doc: dict) -> str:
-        chunks = []
-        for el in doc.get("body", {}).get("content", []):
-            p = el.get("paragraph")
-            if not p:
-                continue
-            for e in p.get("elements", []):
-                tr = e.get("textRun")
-                if tr and "content" in tr:
-                    chunks.append(tr["content"])
-        return "".join(chunks).strip()
+        return flatten_text(doc)
 
-    def _render_html(self, doc: dict) -> str:
-        """
-        Minimal-but-meaningful HTML renderer:
-        - Headings (HEADING_1..HEADING_6) -> <h1>.. <h6>
-        - Normal paragraphs -> <p>
-        - Lists -> <ul>/<ol>/<li> (using doc.lists to tell ordered vs bullet)
-        - Inline styles: bold, italic, underline, strikethrough, link
-        """
-        lists_meta = doc.get("lists", {}) or {}
-        body = doc.get("body", {}) or {}
-        content = body.get("content", []) or []
-
-        html_out = []
-        open_list_stack = []  # stack of ('ul'|'ol')
-        current_list_id = None
-
-        def close_all_lists():
-            nonlocal open_list_stack, html_out, current_list_id
-            while open_list_stack:
-                tag = open_list_stack.pop()
-                html_out.append(f"</{tag}>")
-            current_list_id = None
-
-        def ensure_list(list_id: str, nesting_level: int):
-            """Open/close <ul>/<ol> tags so that nesting matches the paragraph nesting level."""
-            nonlocal open_list_stack, html_out, current_list_id
-            list_def = lists_meta.get(list_id, {})
-            nesting = list_def.get("listProperties", {}).get("nestingLevels", [])
-            # heuristic: presence of glyphType suggests ordered list
-            ordered = False
-            if nesting and nesting_level < len(nesting):
-                ordered = bool(nesting[nesting_level].get("glyphType"))
-            # If Docs didn’t specify, default to unordered
-            tag = "ol" if ordered else "ul"
-
-            # if we’re switching lists (new list_id), close all prior
-            if current_list_id != list_id:
-                close_all_lists()
-                current_list_id = list_id
-
-            # adjust nesting depth
-            depth = len(open_list_stack)
-            while depth < (nesting_level + 1):
-                html_out.append(f"<{tag}>")
-                open_list_stack.append(tag)
-                depth += 1
-            while depth > (nesting_level + 1):
-                last = open_list_stack.pop()
-                html_out.append(f"</{last}>")
-                depth -= 1
-
-        def render_inline(elements: list) -> str:
-            parts = []
-            for el in elements or []:
-                tr = el.get("textRun")
-                if not tr:
-                    continue
-                text = tr.get("content", "")
-                if not text:
-                    continue
-                tstyle = tr.get("textStyle", {}) or {}
-                esc = html.escape(text, quote=False)
-
-                # link
-                link = (tstyle.get("link") or {}).get("url")
-                # inline formatting
-                if tstyle.get("bold"):
-                    esc = f"<strong>{esc}</strong>"
-                if tstyle.get("italic"):
-                    esc = f"<em>{esc}</em>"
-                if tstyle.get("underline"):
-                    esc = f"<u>{esc}</u>"
-                if tstyle.get("strikethrough"):
-                    esc = f"<s>{esc}</s>"
-
-                if link:
-                    esc = f'<a href="{html.escape(link)}" target="_blank" rel="noopener noreferrer">{esc}</a>'
-                parts.append(esc)
-            return "".join(parts)
-
-        for block in content:
-            para = block.get("paragraph")
-            if not para:
-                # Ignore tables/images for now (can extend later)
-                continue
-
-            pstyle = (para.get("paragraphStyle") or {}).get("namedStyleType", "")
-            bullet = para.get("bullet")
-            elements = para.get("elements", [])
-
-            if bullet:
-                # list item
-                list_id = bullet.get("listId")
-                nesting_level = int(bullet.get("nestingLevel", 0))
-                ensure_list(list_id, nesting_level)
-                inner = render_inline(elements).rstrip("\n")
-                html_out.append(f"<li>{inner}</li>")
-                continue  # don’t close lists yet
-
-            # non-list paragraph → close any open lists
-            if open_list_stack:
-                close_all_lists()
-
-            # headings vs paragraph
-            tag = "p"
-            if pstyle.startswith("HEADING_"):
-                # map HEADING_1..6 -> h1..h6
-                try:
-                    level = int(pstyle.split("_")[1])
-                    if 1 <= level <= 6:
-                        tag = f"h{level}"
-                except Exception:
-                    tag = "h2"
-            inner = render_inline(elements).rstrip("\n")
-            # skip empty trailing paragraph the API often gives
-            if not inner.strip():
-                continue
-            html_out.append(f"<{tag}>{inner}</{tag}>")
-
-        # close any lists left open
-        if open_list_stack:
-            close_all_lists()
-
-        return "".join(html_out)
+    @staticmethod
+    def render_html(doc: dict, content: Optional[list] = None) -> str:
+        return render_html(doc, content)
@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+_DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "streamline_embed_index")
+_SAFE_NAME_RE = re.compile(r"[^a-z0-9_]+")
+_PAIR_BLOCK = 1024  # rows per block in all-pairs scoring (caps the score matrix at 1024 x N)
+
+
+def _normalize(vectors) -> np.ndarray:
+    mat = np.asarray(vectors, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat[None, :]
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def pairwise_duplicates(vectors, threshold: float = 0.92) -> List[tuple]:
+    """
+    All-pairs cosine similarity within a batch. Returns [(i, j, score)] with
+    i < j and score >= threshold, highest score first.
+    """
+    mat = _normalize(vectors)
+    pairs = []
+    for start in range(0, len(mat), _PAIR_BLOCK):
+        block = mat[start:start + _PAIR_BLOCK] @ mat.T
+        rows, cols = np.nonzero(block >= threshold)
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            i = start + r
+            if i < c:
+                pairs.append((i, c, float(block[r, c])))
+    pairs.sort(key=lambda p: -p[2])
+    return pairs
+
+
+class EmbeddingIndex:
+    """
+    Append-only vector index stored as a memory-mapped float32 matrix
+    (<dir>/<name>/vectors.f32, unit-normalised rows) plus a JSON sidecar with
+    ids and metadata. Search is a single matrix-vector product over the map, so
+    tens of thousands of rows stay well under 100ms without a vector database.
+
+    Re-adding an existing id overwrites its row in place.
+
+    Env:
+      EMBED_INDEX_DIR  root directory for indexes
+    """
+
+    def __init__(self, name: str, root: Optional[str] = None):
+        root = root or os.getenv("EMBED_INDEX_DIR") or _DEFAULT_DIR
+        self.name = _SAFE_NAME_RE.sub("_", name.lower()) or "default"
+        self.path = os.path.join(root, self.name)
+        self._vec_path = os.path.join(self.path, "vectors.f32")
+        self._meta_path = os.path.join(self.path, "meta.json")
+
+        self._lock = threading.Lock()
+        self.dim: Optional[int] = None
+        self.ids: List[str] = []
+        self.items: List[dict] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._unavailable = False
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ---------- PUBLIC API ----------
+    def add(self, ids: Sequence[str], vectors, items: Optional[Sequence[dict]] = None) -> None:
+        if not len(ids):
+            return
+        mat = _normalize(vectors)
+        items = list(items) if items is not None else [{} for _ in ids]
+        if len(mat) != len(ids) or len(items) != len(ids):
+            raise ValueError("ids, vectors and items must be the same length")
+
+        with self._lock:
+            if self._unavailable:
+                # the meta may have been unreadable only briefly: try again before giving up
+                self._load()
+                if self._unavailable:
+                    raise RuntimeError(f"Embedding index {self.path} is unreadable; not writing to it")
+            dim = self.dim if self.dim is not None else mat.shape[1]
+            if mat.shape[1] != dim:
+                raise ValueError(f"Vector dimension {mat.shape[1]} does not match index dimension {dim}")
+
+            # one row per id, the last copy in this call wins
+            latest = {}
+            for row, doc_id in enumerate(ids):
+                latest[doc_id] = row
+
+            # work on copies; the index only takes them once vectors and meta are on disk
+            new_ids, new_items, positions = list(self.ids), list(self.items), dict(self._positions)
+            updates, appends = {}, []
+            for doc_id, row in latest.items():
+                pos = positions.get(doc_id)
+                if pos is None:
+                    positions[doc_id] = len(new_ids)
+                    new_ids.append(doc_id)
+                    new_items.append(items[row])
+                    appends.append(row)
+                else:
+                    new_items[pos] = items[row]
+                    updates[pos] = row
+
+            os.makedirs(self.path, exist_ok=True)
+            self._release()
+            if updates:
+                rw = np.memmap(self._vec_path, dtype=np.float32, mode="r+", shape=(len(self.ids), dim))
+                for pos, row in updates.items():
+                    rw[pos] = mat[row]
+                rw.flush()
+                del rw
+
+            if appends:
+                with open(self._vec_path, "ab") as f:
+                    # rows left by an add whose meta write failed are not indexed: append over them
+                    f.truncate(len(self.ids) * dim * 4)
+                    f.write(np.ascontiguousarray(mat[appends]).tobytes())
+
+            self._write_meta(dim, new_ids, new_items)
+            self.dim, self.ids, self.items, self._positions = dim, new_ids, new_items, positions
+
+    def search(self, query, k: int = 5, min_score: Optional[float] = None) -> List[List[dict]]:
+        """
+        Top-k cosine matches for one query vector or a batch of them.
+        Returns one list per query: [{"id", "score", "item"}], best first.
+        """
+        queries = _normalize(query)
+        matrix = self._map()
+        if matrix is None or not len(matrix) or k <= 0:
+            return [[] for _ in queries]
+
+        scores = queries @ matrix.T  # (q, n)
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        out = []
+        for qi, cand in enumerate(top):
+            ranked = cand[np.argsort(-scores[qi, cand])]
+            hits = []
+            for pos in ranked.tolist():
+                score = float(scores[qi, pos])
+                if min_score is not None and score < min_score:
+                    break
+                hits.append({"id": self.ids[pos], "score": score, "item": self.items[pos]})
+            out.append(hits)
+        return out
+
+    # ---------- INTERNAL ----------
+    def _map(self) -> Optional[np.memmap]:
+        with self._lock:
+            if self._matrix is None and self.ids:
+                self._matrix = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(len(self.ids), self.dim))
+            return self._matrix
+
+    def _release(self) -> None:
+        self._matrix = None
+
+    def _load(self) -> None:
+        """
+        Read meta.json and line the vector file up with it. Only a successfully
+        read meta may trim vectors (trailing rows from an interrupted add); any
+        other mismatch leaves the files alone and disables writes instead.
+        """
+        self._unavailable = False
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            if os.path.exists(self._vec_path) and os.path.getsize(self._vec_path) > 0:
+                log.error("Embedding index %s has vectors but no meta; leaving files untouched, writes disabled", self.path)
+                self._unavailable = True
+            return
+        except (OSError, ValueError) as e:
+            log.error("Unreadable embedding index %s (%s); leaving files untouched, writes disabled", self.path, e)
+            self._unavailable = True
+            return
+
+        ids, dim = meta.get("ids") or [], meta.get("dim")
+        expected = len(ids) * (dim or 0) * 4
+        size = os.path.getsize(self._vec_path) if os.path.exists(self._vec_path) else 0
+        if size < expected:
+            log.error("Embedding index %s has fewer vectors than its meta lists; leaving files untouched, writes disabled", self.path)
+            self._unavailable = True
+            return
+        if size > expected:
+            # trailing rows from an interrupted add: drop them
+            with open(self._vec_path, "r+b") as f:
+                f.truncate(expected)
+        if not ids:
+            return
+
+        self.dim = dim
+        self.ids = ids
+        self.items = meta.get("items") or [{} for _ in ids]
+        self._positions = {doc_id: pos for pos, doc_id in enumerate(ids)}
+
+    def _write_meta(self, dim: int, ids: List[str], items: List[dict]) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"dim": dim, "ids": ids, "items": items}, f, ensure_ascii=False)
+            os.replace(tmp, self._meta_path)  # vectors are written first, so meta never points past them
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+_INDEXES: Dict[str, EmbeddingIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+def get_index(name: str) -> EmbeddingIndex:
+    """Shared EmbeddingIndex per name (e.g. one per client)."""
+    with _INDEXES_LOCK:
+        if name not in _INDEXES:
+            _INDEXES[name] = EmbeddingIndex(name)
+        return _INDEXES[name]
@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
+_DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "streamline_embeddings.sqlite3")
+
+# OpenAI embeddings limits: 2048 inputs and ~300k tokens per request, 8191 tokens per input.
+# Tokens are estimated at ~4 chars each, with headroom.
+_MAX_BATCH_INPUTS = 2048
+_MAX_BATCH_TOKENS = 250_000
+_MAX_INPUT_CHARS = 8191 * 3
+
+
+def text_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class EmbeddingStore:
+    """
+    Local float32 vector store keyed by sha256(model, text). Vectors are kept as
+    packed float32 blobs (4 bytes per dimension) in a sqlite file.
+
+    Env:
+      OPENAI_EMBED_CACHE_PATH  sqlite file; "off" disables the store
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or os.getenv("OPENAI_EMBED_CACHE_PATH") or _DEFAULT_PATH
+        self.enabled = path.lower() != "off"
+        self._lock = threading.Lock()
+        self._db = None
+        if self.enabled:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS vectors ("
+                    " key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                log.warning("Embedding store disabled (%s): %s", path, e)
+                self.enabled = False
+                self._db = None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(keys)
+        if not self.enabled or not keys:
+            return {}
+        out = {}
+        with self._lock:
+            # stay under sqlite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, blob in self._db.execute(f"SELECT key, vec FROM vectors WHERE key IN ({marks})", chunk):
+                    out[key] = array("f", blob).tolist()
+        return out
+
+    def set_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        if not self.enabled or not items:
+            return
+        rows = [(key, model, len(vec), array("f", vec).tobytes()) for key, vec in items.items()]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO vectors (key, model, dim, vec) VALUES (?, ?, ?, ?)", rows)
+            self._db.commit()
+
+
+class EmbeddingService:
+    """
+    Batched, deduplicated embeddings on top of an OpenAI client. Identical texts
+    are embedded once, stored vectors are reused, and the remainder is split into
+    requests that respect the API's input/token limits.
+    """
+
+    def __init__(self, client, store: Optional[EmbeddingStore] = None, scheduler=None):
+        self.client = client
+        self.store = store or get_embedding_store()
+        self.scheduler = scheduler  # OpenAIScheduler: budgets + retries when provided
+
+    def embed(self, texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+        """Vectors for `texts`, in input order. Raises on API errors."""
+        keys = [text_key(model, t) for t in texts]
+        unique = dict(zip(keys, texts))  # dedupe, keeps first-seen order
+
+        vectors = self.store.get_many(unique)
+        missing = [(k, t) for k, t in unique.items() if k not in vectors]
+        if missing:
+            log.info("Embedding %d new texts (%d cached, %d duplicates)",
+                     len(missing), len(vectors), len(texts) - len(unique))
+
+        for batch in self._batches(missing):
+            response = self._create(model, [t for _, t in batch])
+            fresh = {batch[d.index][0]: d.embedding for d in response.data}
+            self.store.set_many(model, fresh)
+            vectors.update(fresh)
+
+        return [vectors[k] for k in keys]
+
+    def _create(self, model: str, inputs: List[str]):
+        call = lambda: self.client.embeddings.create(model=model, input=inputs)
+        if self.scheduler is None:
+            return call()
+        return self.scheduler.run(call, kind="embedding", tokens=sum(_estimate_tokens(t) for t in inputs))
+
+    @staticmethod
+    def _batches(items: List[tuple]):
+        batch, tokens = [], 0
+        for key, text in items:
+            text = text[:_MAX_INPUT_CHARS]
+            cost = _estimate_tokens(text)
+            if batch and (len(batch) >= _MAX_BATCH_INPUTS or tokens + cost > _MAX_BATCH_TOKENS):
+                yield batch
+                batch, tokens = [], 0
+            batch.append((key, text))
+            tokens += cost
+        if batch:
+            yield batch
+
+
+_SHARED_STORE = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_embedding_store() -> EmbeddingStore:
+    """Process-wide store shared by every EmbeddingService."""
+    with _SHARED_LOCK:
+        if "store" not in _SHARED_STORE:
+            _SHARED_STORE["store"] = EmbeddingStore()
+        return _SHARED_STORE["store"]
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+_DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "streamline_image_cache")
+_DEFAULT_TTL = 7 * 24 * 3600
+
+
+class ImageCache:
+    """
+    Generated image files on disk, keyed by sha256(model, size, prompt), plus a
+    registry of in-flight generations so a page's image is only ever requested
+    once: later callers get the finished file or wait on the running job.
+
+    Env:
+      OPENAI_IMAGE_CACHE_DIR  directory; "off" disables the disk tier
+      OPENAI_IMAGE_CACHE_TTL  seconds (default 7 days)
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: Optional[int] = None):
+        cache_dir = cache_dir or os.getenv("OPENAI_IMAGE_CACHE_DIR") or _DEFAULT_DIR
+        self.cache_dir = None if cache_dir.lower() == "off" else cache_dir
+        self.ttl = int(ttl if ttl is not None else (os.getenv("OPENAI_IMAGE_CACHE_TTL") or _DEFAULT_TTL))
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future
+
+    @staticmethod
+    def make_key(prompt: str, model: str, size: str) -> str:
+        blob = json.dumps({"prompt": prompt, "model": model, "size": size}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    # ---------- PUBLIC API ----------
+    def get(self, key: str) -> Optional[dict]:
+        """{"path", "mime"} for a cached image, or None."""
+        if not self.cache_dir:
+            return None
+        meta_path, data_path = self._paths(key)
+        try:
+            if time.time() - os.path.getmtime(data_path) > self.ttl:
+                return None
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning("Unreadable image cache entry %s: %s", key, e)
+            return None
+        return {"path": data_path, "mime": meta.get("mime", "image/png")}
+
+    def set(self, key: str, img: Optional[dict]) -> Optional[dict]:
+        """
+        Move a generated image file ({"path", "mime"}) into the cache and return
+        the entry pointing at its cached location (the input unchanged when the
+        disk tier is off or the move fails).
+        """
+        if not self.cache_dir or not img or not img.get("path"):
+            return img
+        meta_path, data_path = self._paths(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            shutil.move(img["path"], data_path)
+            self._atomic_write(meta_path, json.dumps({"mime": img.get("mime", "image/png")}).encode("utf-8"))
+        except OSError as e:
+            log.warning("Failed to write image cache entry %s: %s", key, e)
+            return img
+        return {"path": data_path, "mime": img.get("mime", "image/png")}
+
+    def job(self, key: str, start: Callable[[], Future]) -> Future:
+        """
+        Future for this image: already resolved on a cache hit, the running job
+        if one is in flight, otherwise start() is called to launch it (the job
+        is expected to store its result with set()).
+        """
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+
+        cached = self.get(key)
+        if cached is not None:
+            done = Future()
+            done.set_result(cached)
+            return done
+
+        with self._lock:
+            fut = self._inflight.get(key)
+            started = fut is None
+            if started:
+                fut = start()
+                self._inflight[key] = fut
+        if started:
+            # outside the lock: the callback runs immediately if the job already finished
+            fut.add_done_callback(lambda f: self._finish(key, f))
+        return fut
+
+    # ---------- INTERNAL ----------
+    def _finish(self, key: str, fut: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is fut:
+                del self._inflight[key]
+
+    def _paths(self, key: str):
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.img")
+
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+_SHARED_CACHE = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_image_cache() -> ImageCache:
+    """Process-wide image cache shared by every OpenAIHelper instance."""
+    with _SHARED_LOCK:
+        if "cache" not in _SHARED_CACHE:
+            _SHARED_CACHE["cache"] = ImageCache()
+        return _SHARED_CACHE["cache"]
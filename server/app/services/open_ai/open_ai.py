@@ -3,85 +3,124 @@ from openai import OpenAI
 import re
 import json
 import unicodedata
+import logging
+import threading
+import time
+from concurrent.futures import Future
 from typing import Optional, List
-import base64
 
 
 from server.app.utils.formatters.localisation import localize_au
+from server.app.services.open_ai.response_cache import ResponseCache, get_response_cache
+from server.app.services.open_ai.embeddings import EmbeddingService
+from server.app.services.open_ai.scheduler import get_scheduler, estimate_tokens
+from server.app.services.open_ai.image_cache import ImageCache, get_image_cache
+from server.app.services.open_ai.prompts import get_prompt, prompt_stats
+from server.app.utils.formatters.media import decode_b64_to_file
 from server.config.ConfigHelper import ConfigHelper
 
+log = logging.getLogger(__name__)
+
+# One OpenAI client per process (connection pool is reused across helpers)
+_SHARED_CLIENT = {}
+_CLIENT_LOCK = threading.Lock()
+
+
+def _shared_client() -> OpenAI:
+    with _CLIENT_LOCK:
+        if "client" not in _SHARED_CLIENT:
+            # Use ConfigHelper instead of Firestore
+            cfg = ConfigHelper.get_openai_client_config()
+            # Retries/backoff are handled by the scheduler, not the SDK
+            _SHARED_CLIENT["client"] = OpenAI(**{**cfg, "max_retries": 0})
+        return _SHARED_CLIENT["client"]
 
-# ================= CONSTANTS ==================
-
-AU_SPELLING = {
-    'color': 'colour', 'optimize': 'optimise', 'behavior': 'behaviour', 'humor': 'humour',
-    'realize': 'realise', 'prioritize': 'prioritise', 'analyze': 'analyse', 'organize': 'organise',
-    'theater': 'theatre', 'meter': 'metre', 'center': 'centre', 'fulfill': 'fulfil',
-    'enroll': 'enrol', 'installment': 'instalment', 'traveled': 'travelled', 'traveling': 'travelling',
-    'labeled': 'labelled', 'labeling': 'labelling', 'modeled': 'modelled', 'modeling': 'modelling',
-    'revolutionized': 'revolutionised', 'customized': 'customised', 'favor': 'favour',
-    'honor': 'honour', 'jewelry': 'jewellery', 'defense': 'defence', 'license': 'licence',
-    'maximize': 'maximise', 'specialized': 'specialised', 'stabilize': 'stabilise',
-    'organization': 'organisation', "catalog": "catalogue", "gray": "grey", "favorite": "favourite",
-    'organizing': 'organising', 'colouring': 'colouring', 'colourful': 'colourful', 'optimization': 'optimisation', 
-    'behaviors': 'behaviours', 'humorists': 'humourists', 'realization': 'realisation', 'organizing': 'organising',
-    'prioritization': 'prioritisation', 'analysis': 'analyses', 'organisation': 'organisation',
-    'theatergoer': 'theatregoer', 'theaters': 'theatres', 'metre': 'metre', 'centers': 'centres',
-    'fulfilling': 'fulfilling', 'fulfilment': 'fulfilment', 'enrolled': 'enrolled', 'installments': 'instalments',
-    'traveled': 'travelled', 'traveller': 'traveller', 'labeled': 'labelled', 'labelling': 'labelling',
-    'modeled': 'modelled', 'modeling': 'modelling', 'revolutionized': 'revolutionised', 'customized': 'customised',
-    'favoring': 'favouring', 'honorary': 'honourary', 'jewelers': 'jewellers', 'defensive': 'defensive',
-    'licenses': 'licences', 'maximize': 'maximise', 'specializations': 'specialisations', 'stabilized': 'stabilised',
-    'organizational': 'organisational', 'cataloging': 'cataloguing', 'grayish': 'greyish', 'favorable': 'favourable',
-}
 
 # ================= CLASS DEFINITION ==================
 class OpenAIHelper:
     def __init__(self):
-        # Use ConfigHelper instead of Firestore
-        cfg = ConfigHelper.get_openai_client_config()
-        self.client = OpenAI(**cfg)
+        self.client = _shared_client()
+        self.scheduler = get_scheduler()
+        self.response_cache = get_response_cache()
+        self.image_cache = get_image_cache()
+        self.embeddings = EmbeddingService(self.client, scheduler=self.scheduler)
+
+    def generate_text(self, prompt, model="gpt-4o-mini", max_tokens=200, use_cache=True):
+        """
+        Chat completion for a single user prompt. Identical requests are served
+        from the response cache; pass use_cache=False to force a fresh call.
+        """
+        messages = [{"role": "user", "content": prompt}]
+        return self._chat(messages, model, max_tokens, use_cache, label=f"text:{model}")
+
+    def generate_from_prompt(self, name, client_id=None, content_type=None, max_tokens=200, use_cache=True, **values):
+        """
+        Chat completion from a registered prompt template (see prompts.get_prompt):
+        static instructions first, then this call's values.
+        """
+        try:
+            template = get_prompt(name, client_id, content_type)
+            messages = template.messages(**values)
+        except KeyError as e:
+            log.error("Prompt error: %s", e)
+            return None
+        return self._chat(messages, template.model, max_tokens, use_cache, label=name)
+
+    def _chat(self, messages, model, max_tokens, use_cache, label):
+        request = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+        }
+        key = ResponseCache.make_key("chat", request)
+        generated_text = self.response_cache.get(key) if use_cache else None
+        if not use_cache:
+            self.response_cache.record_bypass()
 
-    def generate_text(self, prompt, model="gpt-4o-mini", max_tokens=200):
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                # max_tokens=max_tokens
-            )
-            # Correct way to access the response
-            generated_text = response.choices[0].message.content
+            if generated_text is None:
+                started = time.monotonic()
+                response = self.scheduler.run(
+                    lambda: self.client.chat.completions.create(**request),
+                    kind="text",
+                    tokens=sum(estimate_tokens(m["content"]) for m in messages) + max_tokens,
+                )
+                prompt_stats.record(label, time.monotonic() - started, getattr(response, "usage", None))
+                # Correct way to access the response
+                generated_text = response.choices[0].message.content
+                # Cache the raw completion; post-processing below is cheap and may change
+                self.response_cache.set(key, generated_text)
             generated_text = self.strip_code_blocks(generated_text)  # Strip code block markers
             return self.localize_au(generated_text)
         except Exception as e:
-            print(f"OpenAI API error: {e}")
+            log.error("OpenAI API error: %s", e)
             return None
     
     def get_embedding(self, text_or_texts, model="text-embedding-3-small"):
+        """
+        One vector for a string, or a list of vectors for a list of strings.
+        Lists are deduplicated, batched to the API limits and cached locally.
+        """
         try:
             if isinstance(text_or_texts, str):
                 texts = [text_or_texts]
             else:
-                texts = text_or_texts
+                texts = list(text_or_texts)
 
-            response = self.client.embeddings.create(
-                model=model,
-                input=texts
-            )
-            embeddings = [d.embedding for d in response.data]
+            embeddings = self.embeddings.embed(texts, model=model)
             return embeddings[0] if isinstance(text_or_texts, str) else embeddings
         except Exception as e:
-            print(f"OpenAI Embedding API error: {e}")
+            log.error("OpenAI Embedding API error: %s", e)
             return None
         
     def generate_image(self, prompt: str, model: str = "dall-e-3", size: str = "1024x1024", ) -> Optional[dict]:
         """
-        Generate an image from a prompt.
+        Generate an image from a prompt. The base64 payload is decoded straight
+        into a spool file (MEDIA_SPOOL_DIR) rather than held as bytes.
 
         Returns a dict:
         {
-          "bytes": <raw_image_bytes>,      # for uploading via requests/files
-          "b64": "<base64_string>",        # if you want to store/log
+          "path": "/tmp/.../xxxx.png",     # stream this to uploads
           "mime": "image/png"
         }
         or None on error.
@@ -99,28 +138,62 @@ class OpenAIHelper:
             if model == "dall-e-3":
                 kwargs["response_format"] = "b64_json"
 
-            response = self.client.images.generate(**kwargs)
+            started = time.monotonic()
+            response = self.scheduler.run(lambda: self.client.images.generate(**kwargs), kind="image")
+            prompt_stats.record(f"image:{model}", time.monotonic() - started)
 
             # The new client uses attributes, not dicts
             first = response.data[0]
             b64_data = getattr(first, "b64_json", None)
 
             if not b64_data:
-                print("[OpenAI] No b64_json field on image response.")
+                log.error("[OpenAI] No b64_json field on image response.")
                 return None
 
-            img_bytes = base64.b64decode(b64_data)
-
             return {
-                "bytes": img_bytes,
-                "b64": b64_data,
+                "path": decode_b64_to_file(b64_data, ".png"),
                 "mime": "image/png",
             }
         except Exception as e:
-            print(f"OpenAI Image API error: {e}")
+            log.error("OpenAI Image API error: %s", e)
             return None
 
+    # ========== CONCURRENT JOBS ==============
+    def submit_text(self, prompt, **kwargs) -> Future:
+        """generate_text() on the shared scheduler; resolves to the text or None."""
+        return self.scheduler.spawn(self.generate_text, prompt, **kwargs)
+
+    def submit_image(self, prompt: str, **kwargs) -> Future:
+        """generate_image() on the shared scheduler; resolves to the image dict or None."""
+        return self.scheduler.spawn(self.generate_image, prompt, **kwargs)
+
+    def image_job(self, prompt: str, model: str = "dall-e-3", size: str = "1024x1024") -> Future:
+        """
+        Future for a generated image, shared per (prompt, model, size): resolves
+        at once from the image cache, joins a generation already in flight, or
+        starts one in the background.
+        """
+        key = ImageCache.make_key(prompt, model, size)
+
+        def generate_and_store():
+            # Move the spooled file into the cache before anyone sees its path
+            return self.image_cache.set(key, self.generate_image(prompt, model=model, size=size))
+
+        return self.image_cache.job(key, lambda: self.scheduler.spawn(generate_and_store))
+
+    def gather(self, futures, timeout: Optional[float] = None) -> list:
+        """Await many submitted jobs together; results come back in order."""
+        return self.scheduler.gather(futures, timeout=timeout)
+
     
+    def cache_stats(self) -> dict:
+        """Hit/miss counters for the (process-wide) response cache."""
+        return self.response_cache.stats()
+
+    def prompt_stats(self) -> dict:
+        """Per-template calls, latency and provider-cached prompt tokens."""
+        return prompt_stats.snapshot()
+
     # ========== HELPERS ==============
     def localize_au(self, text):
         return localize_au(text)
@@ -144,8 +217,7 @@ class OpenAIHelper:
         return text
     
     # ================= PRODUCT FUNCTIONS ==================
-    def new_product_title(self, item, p_type="productTitle"):
-        formatted_prompt, model = self.format_prompt(item, p_type)
-        return self.generate_text(prompt=formatted_prompt, model=model)
+    def new_product_title(self, item, p_type="productTitle", client_id=None, content_type=None):
+        return self.generate_from_prompt(p_type, client_id, content_type, item=item)
 
     
\ No newline at end of file
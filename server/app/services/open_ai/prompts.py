@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+from string import Formatter
+from typing import Dict, Optional
+
+from server.app.utils.clients.router import resolve_formatter
+
+log = logging.getLogger(__name__)
+
+# Built-in templates, used when a client module doesn't define its own PROMPTS entry.
+# Shape (same as a formatter module's PROMPTS dict):
+#   {name: {"model": ..., "instructions": <static text>, "input": <per-call text with {fields}>}}
+DEFAULT_PROMPTS = {
+    "productTitle": {
+        "model": "gpt-4o-mini",
+        "instructions": (
+            "You write product titles for an Australian e-commerce store.\n"
+            "Rules:\n"
+            "- Return only the title, no quotes or commentary.\n"
+            "- Lead with the brand and model, then the key differentiator.\n"
+            "- At most 70 characters.\n"
+            "- Use Australian English spelling."
+        ),
+        "input": "Product details:\n{item}",
+    },
+}
+
+# Compiled templates per (client_id, content_type): {key: {name: PromptTemplate}}
+_COMPILED = {}
+_COMPILED_LOCK = threading.Lock()
+
+
+class PromptTemplate:
+    """
+    A prompt split into a static instruction prefix and a per-call input.
+    The prefix always comes first and never varies, so repeated calls share the
+    longest possible prefix and hit the provider's prompt cache.
+    """
+
+    def __init__(self, name: str, instructions: str, input: str, model: str = "gpt-4o-mini"):
+        self.name = name
+        self.instructions = instructions.strip()
+        self.input = input
+        self.model = model
+        self.fields = [field for _, field, _, _ in Formatter().parse(input) if field]
+
+    def _values(self, values: dict) -> dict:
+        missing = [f for f in self.fields if f not in values]
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' missing values: {', '.join(missing)}")
+        # Structured values are serialised deterministically so identical inputs give identical prompts
+        return {
+            k: v if isinstance(v, str) else json.dumps(v, sort_keys=True, ensure_ascii=False, default=str)
+            for k, v in values.items()
+        }
+
+    def messages(self, **values) -> list:
+        """Chat messages: static system prefix, then the rendered user input."""
+        return [
+            {"role": "system", "content": self.instructions},
+            {"role": "user", "content": self.input.format_map(self._values(values))},
+        ]
+
+    def text(self, **values) -> str:
+        """Single-string form (e.g. image prompts): static prefix first, details last."""
+        return f"{self.instructions}\n\n{self.input.format_map(self._values(values))}"
+
+
+def _compile(specs: dict) -> Dict[str, PromptTemplate]:
+    return {
+        name: PromptTemplate(name, spec["instructions"], spec.get("input", ""), spec.get("model", "gpt-4o-mini"))
+        for name, spec in (specs or {}).items()
+    }
+
+
+def get_prompt(name: str, client_id: Optional[str] = None, content_type: Optional[str] = None) -> PromptTemplate:
+    """
+    Template `name` for a client/content type (their formatter module's PROMPTS),
+    falling back to DEFAULT_PROMPTS. Compiled once per client/content type.
+    """
+    key = (client_id, content_type)
+    with _COMPILED_LOCK:
+        templates = _COMPILED.get(key)
+    if templates is None:
+        specs = dict(DEFAULT_PROMPTS)
+        if client_id and content_type:
+            mod = resolve_formatter(client_id, content_type, strict=False)
+            specs.update(getattr(mod, "PROMPTS", None) or {})
+        templates = _compile(specs)
+        with _COMPILED_LOCK:
+            _COMPILED[key] = templates
+
+    template = templates.get(name)
+    if template is None:
+        raise KeyError(f"No prompt template '{name}' for {client_id}/{content_type}")
+    return template
+
+
+class PromptStats:
+    """Per-template call counts, token usage (incl. provider-cached prompt tokens) and latency."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name: str, latency: float, usage=None) -> None:
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+
+        with self._lock:
+            s = self._stats.setdefault(name, {
+                "calls": 0, "promptTokens": 0, "cachedTokens": 0, "completionTokens": 0,
+                "totalLatency": 0.0, "maxLatency": 0.0,
+            })
+            s["calls"] += 1
+            s["promptTokens"] += prompt_tokens
+            s["cachedTokens"] += cached_tokens
+            s["completionTokens"] += completion_tokens
+            s["totalLatency"] += latency
+            s["maxLatency"] = max(s["maxLatency"], latency)
+        log.debug("Prompt %s: %.2fs, %d/%d prompt tokens cached", name, latency, cached_tokens, prompt_tokens)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {}
+            for name, s in self._stats.items():
+                out[name] = {
+                    **s,
+                    "avgLatency": round(s["totalLatency"] / s["calls"], 3) if s["calls"] else 0.0,
+                    "cacheRatio": round(s["cachedTokens"] / s["promptTokens"], 3) if s["promptTokens"] else 0.0,
+                }
+            return out
+
+
+prompt_stats = PromptStats()
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+_DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "streamline_openai_cache.sqlite3")
+_DEFAULT_TTL = 7 * 24 * 3600
+_DEFAULT_MAX_ENTRIES = 5000
+
+
+class ResponseCache:
+    """
+    Content-addressed, disk-backed cache of OpenAI responses.
+
+    Keys are a SHA-256 of the exact request (model, messages, parameters), so
+    identical prompts — e.g. retries after a failed upload batch — are served
+    locally. Entries expire after `ttl` seconds and the least recently used are
+    evicted beyond `max_entries`.
+
+    Env:
+      OPENAI_CACHE_PATH         sqlite file; "off" disables the cache
+      OPENAI_CACHE_TTL          seconds (default 7 days)
+      OPENAI_CACHE_MAX_ENTRIES  default 5000
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[int] = None, max_entries: Optional[int] = None):
+        path = path or os.getenv("OPENAI_CACHE_PATH") or _DEFAULT_PATH
+        self.enabled = path.lower() != "off"
+        self.ttl = int(ttl if ttl is not None else (os.getenv("OPENAI_CACHE_TTL") or _DEFAULT_TTL))
+        self.max_entries = int(max_entries if max_entries is not None else (os.getenv("OPENAI_CACHE_MAX_ENTRIES") or _DEFAULT_MAX_ENTRIES))
+
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0}
+        self._db = None
+        if self.enabled:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                    " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                log.warning("OpenAI response cache disabled (%s): %s", path, e)
+                self.enabled = False
+                self._db = None
+
+    @staticmethod
+    def make_key(kind: str, request: dict) -> str:
+        blob = json.dumps({"kind": kind, **request}, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                self._stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._stats["hits"] += 1
+            return row[0]
+
+    def set(self, key: str, value: Optional[str]) -> None:
+        if not self.enabled or value is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._stats["stores"] += 1
+            self._evict(now)
+            self._db.commit()
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self.enabled else 0
+        lookups = out["hits"] + out["misses"]
+        out["hitRate"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+        return out
+
+    def _evict(self, now: float) -> None:
+        """Drop expired rows, then the least recently used beyond max_entries. Caller holds the lock."""
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+
+_SHARED_CACHE = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache shared by every OpenAIHelper instance."""
+    with _SHARED_LOCK:
+        if "cache" not in _SHARED_CACHE:
+            _SHARED_CACHE["cache"] = ResponseCache()
+        return _SHARED_CACHE["cache"]
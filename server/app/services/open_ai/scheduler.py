@@ -0,0 +1,156 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+log = logging.getLogger(__name__)
+
+_RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+_BACKOFF_BASE = 1.0
+_BACKOFF_CAP = 30.0
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name) or default)
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count (~4 chars per token) for budgeting; no tokenizer needed."""
+    return len(text or "") // 4 + 1
+
+
+class _Budget:
+    """Token bucket refilled continuously to `per_minute` units per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = max(1, per_minute)
+        self._tokens = float(self.capacity)
+        self._rate = self.capacity / 60.0
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: int = 1) -> None:
+        # A single job larger than the whole budget waits for a full bucket
+        amount = min(max(amount, 0), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self._rate)
+                self._stamp = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait_s = (amount - self._tokens) / self._rate
+            time.sleep(min(wait_s, 5.0))
+
+
+class OpenAIScheduler:
+    """
+    Runs OpenAI calls on a shared worker pool under per-minute budgets, retrying
+    429/5xx/connection errors with full-jitter exponential backoff (honouring
+    Retry-After when sent).
+
+    Budgets are per kind: "text" and "embedding" share the request/token budget,
+    "image" has its own request budget.
+
+    Env:
+      OPENAI_RPM          requests per minute (default 500)
+      OPENAI_TPM          tokens per minute (default 200000)
+      OPENAI_IMAGE_RPM    image requests per minute (default 7)
+      OPENAI_WORKERS      concurrent calls (default 8)
+      OPENAI_MAX_RETRIES  retries per job (default 5)
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None, image_rpm: Optional[int] = None,
+                 workers: Optional[int] = None, max_retries: Optional[int] = None):
+        self.requests = _Budget(rpm or _env_int("OPENAI_RPM", 500))
+        self.tokens = _Budget(tpm or _env_int("OPENAI_TPM", 200_000))
+        self.images = _Budget(image_rpm or _env_int("OPENAI_IMAGE_RPM", 7))
+        self.max_retries = max_retries if max_retries is not None else _env_int("OPENAI_MAX_RETRIES", 5)
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers or _env_int("OPENAI_WORKERS", 8),
+            thread_name_prefix="openai",
+        )
+
+    # ---------- PUBLIC API ----------
+    def submit(self, fn: Callable[[], Any], kind: str = "text", tokens: int = 0) -> Future:
+        """Queue fn() as one API call; the Future resolves to its result or raises its final error."""
+        return self._pool.submit(self.run, fn, kind, tokens)
+
+    def spawn(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Run a larger job (which makes its own run() calls) on the shared pool."""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def run(self, fn: Callable[[], Any], kind: str = "text", tokens: int = 0) -> Any:
+        """Run fn() in the calling thread under the budgets, with retries."""
+        attempt = 0
+        while True:
+            self._acquire(kind, tokens)
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                log.warning("OpenAI %s call failed (%s); retry %d/%d in %.1fs",
+                            kind, e, attempt, self.max_retries, delay)
+                time.sleep(delay)
+
+    @staticmethod
+    def gather(futures: Iterable[Future], timeout: Optional[float] = None) -> List[Any]:
+        """
+        Wait for all futures and return their results in order. A failed job
+        yields None (the error is logged) so one bad page never sinks the batch.
+        """
+        futures = list(futures)
+        wait(futures, timeout=timeout)
+        out = []
+        for fut in futures:
+            try:
+                out.append(fut.result(timeout=0))
+            except Exception as e:
+                log.error("OpenAI job failed: %s", e)
+                out.append(None)
+        return out
+
+    # ---------- INTERNAL ----------
+    def _acquire(self, kind: str, tokens: int) -> None:
+        if kind == "image":
+            self.images.acquire()
+            return
+        self.requests.acquire()
+        if tokens:
+            self.tokens.acquire(tokens)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        if attempt >= self.max_retries:
+            return None
+        if isinstance(error, APIStatusError):
+            if error.status_code not in _RETRY_STATUSES:
+                return None
+            retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+            try:
+                if retry_after:
+                    return min(float(retry_after), _BACKOFF_CAP)
+            except ValueError:
+                pass
+        elif not isinstance(error, (APIConnectionError, APITimeoutError)):
+            return None
+        return random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * (2 ** attempt)))
+
+
+_SHARED: Dict[str, Any] = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_scheduler() -> OpenAIScheduler:
+    """Process-wide scheduler shared by every OpenAIHelper instance."""
+    with _SHARED_LOCK:
+        if "scheduler" not in _SHARED:
+            _SHARED["scheduler"] = OpenAIScheduler()
+        return _SHARED["scheduler"]
@@ -0,0 +1,125 @@
+# server/app/services/rest_api/interpret_page/duplicates.py
+import logging
+from typing import List, Optional
+
+from server.app.services.open_ai.embedding_index import get_index, pairwise_duplicates
+from server.app.services.open_ai.open_ai import OpenAIHelper
+from server.app.utils.formatters.parsing import parse_fragment, slugify
+
+log = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.92
+_TEXT_TYPES = {"text", "html"}
+
+
+def _resolve_path(page: dict, path: str):
+    """Resolve a MANIFEST path like "data.pageHeading" against a formatted page."""
+    node = page
+    for part in (path or "").split("."):
+        if not isinstance(node, dict):
+            return None
+        node = node.get(part)
+    return node
+
+
+def _plain(value, ftype: str) -> str:
+    if not value:
+        return ""
+    if ftype == "html":
+        return parse_fragment(str(value)).get_text(" ", strip=True)
+    return str(value).strip()
+
+
+def _entries(page: dict) -> List[dict]:
+    """
+    Split one formatted page (breakdown_pages result) into comparable entries
+    using its MANIFEST: all text/html fields form the page entry, and each FAQ
+    is its own entry.
+    """
+    data = page.get("data") or {}
+    base = data.get("pageUrl") or f"page-{page.get('pageNumber')}"
+    fields = (page.get("manifest") or {}).get("fields") or []
+
+    parts, faqs = [], []
+    for field in fields:
+        ftype = field.get("type")
+        value = _resolve_path(page, field.get("path"))
+        if ftype in _TEXT_TYPES:
+            text = _plain(value, ftype)
+            if text:
+                parts.append(text)
+        elif ftype == "faq" and isinstance(value, list):
+            for faq in value:
+                if not isinstance(faq, dict) or not (faq.get("q") or "").strip():
+                    continue
+                question = faq["q"].strip()
+                faqs.append({
+                    "id": f"{base}#faq-{slugify(question)}",
+                    "kind": "faq",
+                    "pageNumber": page.get("pageNumber"),
+                    "label": question,
+                    "text": f"{question}\n{_plain(faq.get('a'), 'html')}",
+                })
+
+    out = []
+    if parts:
+        out.append({
+            "id": base,
+            "kind": "page",
+            "pageNumber": page.get("pageNumber"),
+            "label": data.get("pageHeading") or base,
+            "text": "\n".join(parts),
+        })
+    return out + faqs
+
+
+def _embed(entries: List[dict], gpt: Optional[OpenAIHelper]):
+    gpt = gpt or OpenAIHelper()
+    vectors = gpt.get_embedding([e["text"] for e in entries])
+    if vectors is None:
+        raise RuntimeError("Embedding request failed")
+    return vectors
+
+
+def _public(entry: dict) -> dict:
+    return {k: entry[k] for k in ("id", "kind", "pageNumber", "label")}
+
+
+def find_duplicates(client_id: str, pages: list, threshold: float = DEFAULT_THRESHOLD,
+                    k: int = 3, gpt: Optional[OpenAIHelper] = None) -> dict:
+    """
+    Near-duplicate check for breakdown_pages output.
+    Returns:
+      {
+        "pairs":   [ {"a": {...}, "b": {...}, "score": 0.97}, ... ],          # within this brief
+        "matches": [ {"entry": {...}, "similar": [{"id", "score", "item"}]} ] # vs previously uploaded
+      }
+    """
+    entries = [e for p in (pages or []) for e in _entries(p)]
+    if not entries:
+        return {"pairs": [], "matches": []}
+
+    vectors = _embed(entries, gpt)
+
+    pairs = [
+        {"a": _public(entries[i]), "b": _public(entries[j]), "score": round(score, 4)}
+        for i, j, score in pairwise_duplicates(vectors, threshold)
+    ]
+
+    matches = []
+    for entry, hits in zip(entries, get_index(client_id).search(vectors, k=k, min_score=threshold)):
+        hits = [{**h, "score": round(h["score"], 4)} for h in hits if h["id"] != entry["id"]]
+        if hits:
+            matches.append({"entry": _public(entry), "similar": hits})
+
+    return {"pairs": pairs, "matches": matches}
+
+
+def remember_pages(client_id: str, pages: list, gpt: Optional[OpenAIHelper] = None) -> int:
+    """Add formatted pages (and their FAQs) to the client's index of uploaded content."""
+    entries = [e for p in (pages or []) for e in _entries(p)]
+    if not entries:
+        return 0
+    vectors = _embed(entries, gpt)
+    get_index(client_id).add([e["id"] for e in entries], vectors, [_public(e) for e in entries])
+    return len(entries)
@@ -1,13 +1,38 @@
+import hashlib
 import re
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from bs4 import BeautifulSoup, Tag
 from urllib.parse import urlparse, parse_qs, unquote
+from server.app.utils.formatters import docs_render, parsing
+from server.app.utils.formatters.parsing import make_soup, render_nodes
+from server.app.utils.formatters.docs_render import render_html
 
 PAGE_MARKER_RE = re.compile(r"^\s*Page\s+(\d+)\s*$", re.I)
+_PAGE_URL_RE = re.compile(r"^\s*Page URL\s*:\s*(\S+)", re.I)
+_PAGE_URL_LABEL_RE = re.compile(r"Page URL\s*:", re.I)
+_META_TITLE_RE = re.compile(r"^\s*Meta title\s*:\s*(.+)$", re.I)
+_META_DESC_RE = re.compile(r"^\s*Meta description\s*:\s*(.+)$", re.I)
+_AUTHOR_RE = re.compile(r"^\s*Author\s*:\s*(.+)$", re.I)
+_CLIENT_NAME_RE = re.compile(r"^\s*Client Name\s*:\s*", re.I)
+_CLIENT_URL_RE = re.compile(r"^\s*Client URL\s*:?\s*(\S+)?", re.I)
+_NUM_PAGES_RE = re.compile(r"^\s*Number of Pages\s*:\s*(\d+)?", re.I)
+# Containers we look through when indexing blocks (Google's export is flat, pasted HTML often isn't)
+_WRAPPER_TAGS = {"div", "section", "article", "main"}
 EXCLUSION_TERMS = [
     "na", "n/a", "none"
 ]
 
+def _source_version(*paths: str) -> str:
+    h = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+# Changes whenever the interpreter or the renderers it uses change, so caches of
+# interpreted pages can key on it and never serve output from an older deploy
+PARSER_VERSION = _source_version(__file__, parsing.__file__, docs_render.__file__)
+
 def _t(el: Optional[Tag]) -> str:
     return (el.get_text(" ", strip=True) if el else "").strip()
 
@@ -23,22 +48,6 @@ def _unwrap_google_redirect(href: Optional[str]) -> Optional[str]:
     except Exception:
         return href
 
-def _is_page_title_marker(el: Tag) -> bool:
-    txt = _t(el)
-    if not PAGE_MARKER_RE.match(txt):
-        return False
-    classes = " ".join(el.get("class", [])).lower()
-    return "title" in classes  # strict Google Docs "Title" style
-
-def _find_page_markers(soup: BeautifulSoup) -> List[Tag]:
-    # Prefer elements with class containing 'title'
-    candidates = soup.find_all(True, class_=lambda c: c and "title" in " ".join(c).lower())
-    markers = [el for el in candidates if PAGE_MARKER_RE.match(_t(el))]
-    if markers:
-        return markers
-    # Fallback: any element matching "Page N"
-    return [el for el in soup.find_all(True) if PAGE_MARKER_RE.match(_t(el))]
-
 def _parse_globals(soup: BeautifulSoup) -> Dict[str, Any]:
     out = {"clientName": None, "clientUrl": None, "numberOfPages": None}
 
@@ -78,106 +87,269 @@ def _parse_globals(soup: BeautifulSoup) -> Dict[str, Any]:
 
     return out
 
-def _extract_meta_and_find_h1(marker: Tag) -> Tuple[Dict[str, Optional[str]], Optional[Tag]]:
+def _has_title_class(el: Tag) -> bool:
+    """True when the element (or something inside it) carries a Google Docs "Title" class."""
+    if "title" in " ".join(el.get("class", [])).lower():
+        return True
+    return el.find(True, class_=lambda c: c and "title" in c.lower()) is not None
+
+def _flatten_blocks(container: Tag) -> List[Tag]:
     """
-    Collects Page URL / Meta title / Meta description after the 'Page N' Title,
-    and returns the first content H1 (start of page content).
-    Stops at the next 'Page N' Title or the first content H1.
+    Top-level block elements in document order. Wrapper DIVs/sections that only
+    hold other tags are descended into so every paragraph/heading is its own line.
     """
-    page_url = meta_title = meta_desc = author = None
-    content_h1: Optional[Tag] = None
+    blocks: List[Tag] = []
+    for ch in container.children:
+        if not isinstance(ch, Tag):
+            continue
+        if ch.name in _WRAPPER_TAGS and all(
+            isinstance(c, Tag) or not str(c).strip() for c in ch.children
+        ) and ch.find(True) is not None:
+            blocks.extend(_flatten_blocks(ch))
+        else:
+            blocks.append(ch)
+    return blocks
 
-    for el in marker.next_elements:
-        if not isinstance(el, Tag):
+def _build_index(soup: BeautifulSoup) -> Dict[str, Any]:
+    """
+    Single pass over the document body. Each block's text is computed exactly once
+    and recorded alongside whether it is a "Page N" marker (strict Title style or
+    plain) and whether it holds a content H1.
+    """
+    body = soup.body or soup
+    lines: List[Dict[str, Any]] = []
+    title_markers: List[int] = []
+    plain_markers: List[int] = []
+
+    blocks = _flatten_blocks(body)
+    # First H1 per block from one document-order sweep (not a find() per block)
+    block_pos = {id(node): i for i, node in enumerate(blocks)}
+    first_h1: Dict[int, Tag] = {}
+    for h1 in body.find_all("h1"):
+        node = h1
+        while node is not None and id(node) not in block_pos:
+            node = node.parent
+        if node is not None:
+            first_h1.setdefault(block_pos[id(node)], h1)
+
+    for idx, node in enumerate(blocks):
+        txt = _t(node)
+        is_marker = bool(PAGE_MARKER_RE.match(txt))
+        heading = None
+        if not is_marker:
+            h1 = first_h1.get(idx)
+            if h1 is not None:
+                heading = _t(h1)
+                if PAGE_MARKER_RE.match(heading):
+                    heading = None
+
+        if is_marker:
+            plain_markers.append(idx)
+            if _has_title_class(node):
+                title_markers.append(idx)
+
+        lines.append({"node": node, "text": txt, "heading": heading})
+
+    return {"lines": lines, "markers": title_markers or plain_markers}
+
+def _paragraph_text_and_href(para: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """Plain text of a Docs API paragraph plus the first link URL in it (if any)."""
+    chunks = []
+    href = None
+    for el in para.get("elements", []) or []:
+        tr = el.get("textRun")
+        if not tr:
             continue
+        chunks.append(tr.get("content", ""))
+        if href is None:
+            href = ((tr.get("textStyle") or {}).get("link") or {}).get("url")
+    return "".join(chunks).replace("\x0b", " ").strip(), href
 
-        # next page title marker ends this page's meta scan
-        if _is_page_title_marker(el) and el is not marker:
-            break
+def _build_doc_index(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Same index as _build_index, but built straight from the Docs API body.content
+    paragraphs: TITLE-styled "Page N" paragraphs are markers, HEADING_1 paragraphs
+    are content headings. Each line keeps its raw block so page bodies can be
+    rendered without ever serialising the whole document.
+    """
+    content = ((doc.get("body") or {}).get("content") or [])
+    lines: List[Dict[str, Any]] = []
+    title_markers: List[int] = []
+    plain_markers: List[int] = []
+
+    for block in content:
+        para = block.get("paragraph")
+        if not para:
+            continue
+        txt, href = _paragraph_text_and_href(para)
+        style = (para.get("paragraphStyle") or {}).get("namedStyleType", "")
+        is_marker = bool(PAGE_MARKER_RE.match(txt))
+
+        heading = None
+        if style == "HEADING_1" and txt and not is_marker and not para.get("bullet"):
+            heading = txt
 
-        txt = _t(el)
+        idx = len(lines)
+        if is_marker:
+            plain_markers.append(idx)
+            if style == "TITLE":
+                title_markers.append(idx)
 
-        # first real H1 marks content start and ends meta scan
-        if el.name == "h1" and not PAGE_MARKER_RE.match(txt):
-            content_h1 = el
+        lines.append({"block": block, "text": txt, "href": href, "heading": heading})
+
+    return {"lines": lines, "markers": title_markers or plain_markers}
+
+def _line_href(line: Dict[str, Any]) -> Optional[str]:
+    if "href" in line:
+        return line["href"]
+    node = line["node"]
+    a = node if node.name == "a" else node.find("a")
+    return a.get("href") if a else None
+
+def _parse_globals_from_lines(lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Globals block for the structured (Docs API JSON) path; mirrors _parse_globals."""
+    out = {"clientName": None, "clientUrl": None, "numberOfPages": None}
+
+    for i, line in enumerate(lines):
+        txt = line["text"]
+
+        if out["clientName"] is None and _CLIENT_NAME_RE.match(txt):
+            out["clientName"] = _CLIENT_NAME_RE.sub("", txt).strip()
+
+        elif out["clientUrl"] is None and _CLIENT_URL_RE.match(txt):
+            # Prefer a link on the label line or the first one after it
+            href = next((_line_href(ln) for ln in lines[i:] if _line_href(ln)), None)
+            if href:
+                out["clientUrl"] = _unwrap_google_redirect(href)
+            else:
+                m = _CLIENT_URL_RE.match(txt)
+                if m.group(1):
+                    out["clientUrl"] = m.group(1).strip()
+
+        elif out["numberOfPages"] is None and _NUM_PAGES_RE.match(txt):
+            # Number is usually on the label line, occasionally on the next one
+            num = _NUM_PAGES_RE.match(txt).group(1)
+            if not num and i + 1 < len(lines):
+                num = lines[i + 1]["text"]
+            if num and num.isdigit():
+                out["numberOfPages"] = int(num)
+
+        if None not in out.values():
             break
 
+    return out
+
+def _extract_meta_and_find_h1(lines: List[Dict[str, Any]], start: int, end: int) -> Tuple[Dict[str, Optional[str]], Optional[int]]:
+    """
+    Collects Page URL / Meta title / Meta description / Author from lines[start:end]
+    (the lines between a 'Page N' marker and the next one) and returns the index of
+    the first content H1 (start of page content), which also ends the meta scan.
+    """
+    page_url = meta_title = meta_desc = author = None
+
+    for i in range(start, end):
+        line = lines[i]
+        if line["heading"] is not None:
+            return {"pageUrl": page_url, "metaTitle": meta_title, "metaDescription": meta_desc, "author": author}, i
+
+        txt = line["text"]
+        if not txt:
+            continue
+
         if page_url is None:
-            m = re.match(r"^\s*Page URL\s*:\s*(\S+)", txt, re.I)
+            m = _PAGE_URL_RE.match(txt)
             if m:
                 page_url = m.group(1).strip()
-            else:
-                a = el.find("a") if el.name != "a" else el
-                if a and a.get("href") and re.search(r"Page URL\s*:", el.get_text(" ", strip=True), re.I):
-                    page_url = _unwrap_google_redirect(a.get("href"))
+            elif _PAGE_URL_LABEL_RE.search(txt):
+                href = _line_href(line)
+                if href:
+                    page_url = _unwrap_google_redirect(href)
             if page_url:
                 continue
 
         if meta_title is None:
-            m = re.match(r"^\s*Meta title\s*:\s*(.+)$", txt, re.I)
+            m = _META_TITLE_RE.match(txt)
             if m:
                 meta_title = m.group(1).strip()
                 if meta_title.lower() in EXCLUSION_TERMS: meta_title = None
                 continue
 
         if meta_desc is None:
-            m = re.match(r"^\s*Meta description\s*:\s*(.+)$", txt, re.I)
+            m = _META_DESC_RE.match(txt)
             if m:
                 meta_desc = m.group(1).strip()
                 continue
 
         if author is None:
-            m = re.match(r"^\s*Author\s*:\s*(.+)$", txt, re.I)
+            m = _AUTHOR_RE.match(txt)
             if m:
                 author = m.group(1).strip()
                 continue
 
+    return {"pageUrl": page_url, "metaTitle": meta_title, "metaDescription": meta_desc, "author": author}, None
 
-    return {"pageUrl": page_url, "metaTitle": meta_title, "metaDescription": meta_desc, "author": author}, content_h1
+def _collect_page_body_html(lines: List[Dict[str, Any]], start: int, end: int) -> str:
+    """Return HTML from the H1 line (inclusive) up to—but not including—the next page marker."""
+    return render_nodes(lines[i]["node"] for i in range(start, end)).strip()
 
-def _top_body_child(node: Tag) -> Tag:
-    """Ascend until the direct child of <body> (or the highest available)."""
-    cur = node
-    while cur.parent and cur.parent.name != "body":
-        cur = cur.parent
-    return cur
+def _render_doc_page_body(doc: Dict[str, Any], lines: List[Dict[str, Any]], start: int, end: int) -> str:
+    """Render only this page's Docs API blocks (H1 inclusive, next marker exclusive) to HTML."""
+    return render_html(doc, [lines[i]["block"] for i in range(start, end)]).strip()
 
-def _collect_page_body_html(soup: BeautifulSoup, start_h1: Tag, next_marker: Optional[Tag]) -> str:
+def _iter_pages(globals_blk: Dict[str, Any], index: Dict[str, Any], render_body) -> Iterator[Dict[str, Any]]:
+    """Yield pages sliced out of a line index; render_body(lines, start, end) produces the pageBody HTML."""
+    lines = index["lines"]
+    markers = index["markers"]
+
+    expected = globals_blk.get("numberOfPages")
+    if isinstance(expected, int) and expected > 0:
+        markers = markers[:expected]
+
+    for idx, marker_idx in enumerate(markers):
+        marker_txt = lines[marker_idx]["text"]
+        m = PAGE_MARKER_RE.match(marker_txt)
+        page_number = int(m.group(1)) if m else (idx + 1)
+
+        end = index["markers"][idx + 1] if idx + 1 < len(index["markers"]) else len(lines)
+        meta, h1_idx = _extract_meta_and_find_h1(lines, marker_idx + 1, end)
+
+        page_heading = lines[h1_idx]["heading"] if h1_idx is not None else None
+        page_body = render_body(lines, h1_idx, end) if h1_idx is not None else ""
+
+        yield {
+            "pageNumber": page_number,
+            "titleMarker": marker_txt,
+            "pageUrl": meta["pageUrl"],
+            "metaTitle": meta["metaTitle"],
+            "author": meta["author"],
+            "metaDescription": meta["metaDescription"],
+            "pageHeading": page_heading,
+            "pageBody": page_body
+        }
+
+def iter_interpret_page(google_doc_html: str) -> Iterator[Dict[str, Any]]:
     """
-    Return HTML from the H1 (inclusive) up to—but not including—the next page Title marker.
-    Works even when markers/content are wrapped in different container DIVs.
+    Generator form of interpret_page: yields the globals block first, then each
+    page dict as soon as it has been segmented.
     """
-    body = soup.body or soup
-    body_children: List[Tag] = [ch for ch in body.children if isinstance(ch, Tag)]
+    soup = make_soup(google_doc_html)
 
-    start_node = _top_body_child(start_h1)
-    try:
-        start_idx = body_children.index(start_node)
-    except ValueError:
-        start_idx = None
-
-    end_node = _top_body_child(next_marker) if next_marker else None
-    end_idx = None
-    if end_node is not None:
-        try:
-            end_idx = body_children.index(end_node)
-        except ValueError:
-            end_idx = None
-
-    # Preferred path: slice by body children indices (most robust / no duplication)
-    if start_idx is not None:
-        slice_nodes = body_children[start_idx:(end_idx if end_idx is not None else len(body_children))]
-        return "".join(str(n) for n in slice_nodes).strip()
-
-    # Fallback: walk forward from the start_h1 collecting until we hit next_marker
-    collected = [str(start_h1)]
-    for el in start_h1.next_elements:
-        if isinstance(el, Tag) and next_marker is not None and el is next_marker:
-            break
-        # Only capture top-level tags to avoid duplicates
-        if isinstance(el, Tag) and el.parent == body:
-            collected.append(str(el))
-    return "".join(collected).strip()
+    globals_blk = _parse_globals(soup)
+    index = _build_index(soup)
+    yield globals_blk
+    yield from _iter_pages(globals_blk, index, _collect_page_body_html)
+
+def iter_interpret_document(doc: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Generator form of interpret_document (globals first, then pages)."""
+    index = _build_doc_index(doc or {})
+
+    globals_blk = _parse_globals_from_lines(index["lines"])
+    yield globals_blk
+    yield from _iter_pages(
+        globals_blk,
+        index,
+        lambda lines, start, end: _render_doc_page_body(doc, lines, start, end),
+    )
 
 def interpret_page(google_doc_html: str) -> Dict[str, Any]:
     """
@@ -197,38 +369,16 @@ def interpret_page(google_doc_html: str) -> Dict[str, Any]:
       ]
     }
     """
-    soup = BeautifulSoup(google_doc_html, "html.parser")
-
-    globals_blk = _parse_globals(soup)
-    markers = _find_page_markers(soup)
-
-    pages: List[Dict[str, Any]] = []
-    for idx, marker in enumerate(markers):
-        m = PAGE_MARKER_RE.match(_t(marker))
-        page_number = int(m.group(1)) if m else (idx + 1)
-
-        meta, content_h1 = _extract_meta_and_find_h1(marker)
-
-        page_heading = _t(content_h1) if content_h1 else None
-        next_marker = markers[idx + 1] if idx + 1 < len(markers) else None
-        page_body = _collect_page_body_html(soup, content_h1, next_marker) if content_h1 else ""
-
-        pages.append({
-            "pageNumber": page_number,
-            "titleMarker": _t(marker),
-            "pageUrl": meta["pageUrl"],
-            "metaTitle": meta["metaTitle"],
-            "author": meta["author"],
-            "metaDescription": meta["metaDescription"],
-            "pageHeading": page_heading,
-            "pageBody": page_body
-        })
-
-    expected = globals_blk.get("numberOfPages")
-    if isinstance(expected, int) and expected > 0 and len(pages) > expected:
-        pages = pages[:expected]
-
-    return {"globals": globals_blk, "pages": pages}
-
-
+    it = iter_interpret_page(google_doc_html)
+    globals_blk = next(it)
+    return {"globals": globals_blk, "pages": list(it)}
 
+def interpret_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Same output as interpret_page, but segments a Google Docs API document dict
+    directly (no full-document HTML render + re-parse). Only each page's body
+    is rendered to HTML.
+    """
+    it = iter_interpret_document(doc)
+    globals_blk = next(it)
+    return {"globals": globals_blk, "pages": list(it)}
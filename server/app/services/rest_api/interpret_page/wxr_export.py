@@ -0,0 +1,221 @@
+# server/app/services/rest_api/interpret_page/wxr_export.py
+import logging
+import mimetypes
+import os
+import re
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from server.app.utils.clients.router import resolve_formatter
+from server.app.utils.formatters.extraction import extract_slug
+from server.app.utils.formatters.parsing import slugify
+from server.app.services.wordpress.meta.directory import normalize_name
+from server.app.services.wordpress.meta.meta_content import yoast_meta
+
+log = logging.getLogger(__name__)
+
+# MANIFEST upload.metafield -> WXR post element (everything else becomes postmeta)
+_TITLE_KEYS = ("title",)
+_CONTENT_KEYS = ("content", "body_content")
+_EXCERPT_KEYS = ("excerpt",)
+_SLUG_KEYS = ("slug", "handle")
+_AUTHOR_KEYS = ("author",)
+_IMAGE_KEYS = ("featured_image", "featured_media")
+_YOAST_KEYS = ("meta_title", "meta_description")
+
+_DEFAULT_STATUS = (os.getenv("WXR_POST_STATUS") or "draft").strip()
+# One of these anywhere makes the whole file fail to import
+_INVALID_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _resolve_path(page: dict, path: str):
+    node = page
+    for part in (path or "").split("."):
+        if not isinstance(node, dict):
+            return None
+        node = node.get(part)
+    return node
+
+
+def _clean(value) -> str:
+    """Text without characters XML 1.0 forbids (e.g. \x0b soft breaks from Docs exports)."""
+    return _INVALID_XML_RE.sub("", "" if value is None else str(value))
+
+
+def _cdata(value) -> str:
+    text = _clean(value)
+    # "]]>" can't appear inside one CDATA section: split it across two
+    return "<![CDATA[" + text.replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+
+def _upload_fields(page: dict) -> dict:
+    """{metafield: value} for every MANIFEST field that declares an upload target."""
+    out = {}
+    for field in (page.get("manifest") or {}).get("fields") or []:
+        key = (field.get("upload") or {}).get("metafield")
+        if not key:
+            continue
+        value = _resolve_path(page, field.get("path"))
+        if value not in (None, "", [], {}):
+            out[key] = value
+    return out
+
+
+def _first(fields: dict, keys):
+    for key in keys:
+        if fields.get(key):
+            return fields[key]
+    return None
+
+
+def _page_post(page: dict, mod, status: str) -> dict:
+    data = page.get("data") or {}
+    fields = _upload_fields(page)
+
+    title = _first(fields, _TITLE_KEYS) or data.get("pageHeading") or ""
+    slug = _first(fields, _SLUG_KEYS) or extract_slug(data.get("pageUrl") or "") or slugify(title)
+    author = _first(fields, _AUTHOR_KEYS) or data.get("author") or ""
+    image = _first(fields, _IMAGE_KEYS) or data.get("featuredImage")
+
+    handled = set(_TITLE_KEYS + _CONTENT_KEYS + _EXCERPT_KEYS + _SLUG_KEYS + _AUTHOR_KEYS + _IMAGE_KEYS + _YOAST_KEYS)
+    meta = yoast_meta(fields.get("meta_title"), fields.get("meta_description"))
+    meta.update({k: v for k, v in fields.items() if k not in handled and isinstance(v, (str, int, float))})
+
+    return {
+        "post_type": getattr(mod, "ENDPOINT", None) or page.get("content_type"),
+        "title": title,
+        "slug": slug,
+        "content": _first(fields, _CONTENT_KEYS) or "",
+        "excerpt": _first(fields, _EXCERPT_KEYS) or "",
+        "author": str(author).strip(),
+        "status": status,
+        "meta": meta,
+        "image": image if isinstance(image, str) and image.startswith(("http://", "https://")) else None,
+    }
+
+
+def _author_login(name: str) -> str:
+    return normalize_name(name).replace(" ", "") or "admin"
+
+
+def _item(post_id: int, post: dict, now: str, extra: str = "") -> str:
+    meta = "".join(
+        f"\n\t\t<wp:postmeta>\n\t\t\t<wp:meta_key>{_cdata(k)}</wp:meta_key>\n\t\t\t<wp:meta_value>{_cdata(v)}</wp:meta_value>\n\t\t</wp:postmeta>"
+        for k, v in post["meta"].items()
+    )
+    return (
+        "\n\t<item>"
+        f"\n\t\t<title>{_cdata(post['title'])}</title>"
+        f"\n\t\t<dc:creator>{_cdata(_author_login(post['author']) if post['author'] else 'admin')}</dc:creator>"
+        f"\n\t\t<content:encoded>{_cdata(post['content'])}</content:encoded>"
+        f"\n\t\t<excerpt:encoded>{_cdata(post['excerpt'])}</excerpt:encoded>"
+        f"\n\t\t<wp:post_id>{post_id}</wp:post_id>"
+        f"\n\t\t<wp:post_date>{_cdata(now)}</wp:post_date>"
+        f"\n\t\t<wp:post_date_gmt>{_cdata(now)}</wp:post_date_gmt>"
+        "\n\t\t<wp:comment_status><![CDATA[closed]]></wp:comment_status>"
+        "\n\t\t<wp:ping_status><![CDATA[closed]]></wp:ping_status>"
+        f"\n\t\t<wp:post_name>{_cdata(post['slug'])}</wp:post_name>"
+        f"\n\t\t<wp:status>{_cdata(post['status'])}</wp:status>"
+        f"\n\t\t<wp:post_parent>{post.get('parent', 0)}</wp:post_parent>"
+        "\n\t\t<wp:menu_order>0</wp:menu_order>"
+        f"\n\t\t<wp:post_type>{_cdata(post['post_type'])}</wp:post_type>"
+        f"{extra}{meta}"
+        "\n\t</item>"
+    )
+
+
+def _attachment(post_id: int, parent_id: int, post: dict, now: str) -> str:
+    url = post["image"]
+    attachment = {
+        "post_type": "attachment",
+        "title": post["title"] or post["slug"],
+        "slug": f"{post['slug']}-featured" if post["slug"] else "",
+        "content": "",
+        "excerpt": "",
+        "author": post["author"],
+        "status": "inherit",
+        "parent": parent_id,
+        "meta": {"_wp_attachment_image_alt": post["title"] or post["slug"]},
+    }
+    mime = mimetypes.guess_type(url.split("?", 1)[0])[0] or "image/jpeg"
+    extra = (
+        f"\n\t\t<wp:attachment_url>{_cdata(url)}</wp:attachment_url>"
+        f"\n\t\t<guid isPermaLink=\"false\">{escape(_clean(url))}</guid>"
+        f"\n\t\t<wp:post_mime_type>{_cdata(mime)}</wp:post_mime_type>"
+    )
+    return _item(post_id, attachment, now, extra)
+
+
+def convert_wxr(payload: dict):
+    """
+    Build a WordPress WXR (1.2) import file from formatted pages, same payload
+    shape as convert_csv(). Each page becomes one post of its formatter's
+    ENDPOINT type, filled from the MANIFEST upload.metafield keys: title,
+    slug/handle, content/body_content, author, meta_title/meta_description
+    (Yoast postmeta); any other scalar metafield is written as postmeta.
+
+    Pages with a featured image URL (featured_image metafield or
+    data.featuredImage) get an attachment item the importer downloads, linked
+    through _thumbnail_id. Returns (xml_text, filename).
+    """
+    client_id = payload.get("client_id") or "client"
+    results = payload.get("results") or {}
+    status = (payload.get("status") or _DEFAULT_STATUS).strip()
+
+    if isinstance(results, dict) and isinstance(results.get("pages"), list):
+        pages = results["pages"]
+    elif isinstance(results, list):
+        pages = results
+    else:
+        pages = []
+
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    items, authors = [], {}
+    next_id = 1
+
+    for page in pages:
+        content_type = page.get("content_type")
+        mod = resolve_formatter(client_id, content_type, strict=False) if content_type else None
+        if not mod:
+            continue
+        try:
+            post = _page_post(page, mod, status)
+        except Exception:
+            log.exception("WXR export skipped page %s (%s/%s)", page.get("pageNumber"), client_id, content_type)
+            continue
+
+        if post["author"]:
+            authors.setdefault(_author_login(post["author"]), post["author"])
+
+        post_id, next_id = next_id, next_id + 1
+        if post["image"]:
+            attachment_id, next_id = next_id, next_id + 1
+            post["meta"]["_thumbnail_id"] = attachment_id
+            items.append(_item(post_id, post, now))
+            items.append(_attachment(attachment_id, post_id, post, now))
+        else:
+            items.append(_item(post_id, post, now))
+
+    author_xml = "".join(
+        f"\n\t<wp:author><wp:author_login>{_cdata(login)}</wp:author_login>"
+        f"<wp:author_display_name>{_cdata(name)}</wp:author_display_name></wp:author>"
+        for login, name in authors.items()
+    )
+
+    xml_text = (
+        '<?xml version="1.0" encoding="UTF-8" ?>\n'
+        '<rss version="2.0"'
+        ' xmlns:excerpt="http://wordpress.org/export/1.2/excerpt/"'
+        ' xmlns:content="http://purl.org/rss/1.0/modules/content/"'
+        ' xmlns:wfw="http://wellformedweb.org/CommentAPI/"'
+        ' xmlns:dc="http://purl.org/dc/elements/1.1/"'
+        ' xmlns:wp="http://wordpress.org/export/1.2/">\n'
+        "<channel>"
+        f"\n\t<title>{escape(_clean(client_id))}</title>"
+        "\n\t<language>en-AU</language>"
+        "\n\t<wp:wxr_version>1.2</wp:wxr_version>"
+        f"{author_xml}"
+        f"{''.join(items)}"
+        "\n</channel>\n</rss>\n"
+    )
+    return xml_text, f"{client_id}_pages.xml"
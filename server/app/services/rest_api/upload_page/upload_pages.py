@@ -1,6 +1,34 @@
 # server/app/services/rest_api/interpret_page/upload_pages.py
+import logging
+import os
 
 from server.app.utils.clients.router import resolve_formatter
+from server.app.services.rest_api.interpret_page.duplicates import remember_pages
+
+log = logging.getLogger(__name__)
+
+# Add successfully uploaded pages to the client's duplicate-detection index
+_INDEX_UPLOADS = (os.getenv("EMBED_INDEX_UPLOADS") or "").strip().lower() in ("1", "true", "yes")
+
+def prepare_uploads(client_id: str, pages: list) -> None:
+    """
+    Give each formatter a chance to start slow work for all of its pages up
+    front (e.g. queue image generation) via an optional prepare_uploads(pages).
+    Runs right after /parse/pages and again at upload; hooks must be idempotent.
+    """
+    by_type = {}
+    for page in pages:
+        by_type.setdefault(page.get("content_type"), []).append(page)
+
+    for content_type, group in by_type.items():
+        try:
+            mod = resolve_formatter(client_id, content_type, strict=False)
+            prepare_fn = getattr(mod, "prepare_uploads", None) if mod else None
+            if callable(prepare_fn):
+                prepare_fn(group)
+        except Exception:
+            log.exception("prepare_uploads failed for %s/%s", client_id, content_type)
+
 
 def handle_upload(payload: dict) -> dict:
     client_id = payload.get("client_id") or "client"
@@ -14,59 +42,75 @@ def handle_upload(payload: dict) -> dict:
     else:
         pages = []
 
-    output = []
-    success_count = 0
-    fail_count = 0
+    prepare_uploads(client_id, pages)
 
-    for page in pages:
-        content_type = page.get("content_type")
-        page_number = page.get("pageNumber")
+    # Modules with upload_pages(pages) take their whole group at once (batched
+    # writes) and return one status per page, in order; others go page by page
+    by_type = {}
+    for index, page in enumerate(pages):
+        by_type.setdefault(page.get("content_type"), []).append(index)
 
+    statuses = {}
+    for content_type, indexes in by_type.items():
         mod = resolve_formatter(client_id, content_type, strict=False)
         if not mod:
-            output.append({
-                "pageNumber": page_number,
-                "status": "failed",
-                "error": f"No formatter found for {content_type}"
-            })
-            fail_count += 1
+            statuses.update({i: f"No formatter found for {content_type}" for i in indexes})
             continue
 
+        bulk_fn = getattr(mod, "upload_pages", None)
         upload_fn = getattr(mod, "upload_page", None)
 
+        if callable(bulk_fn):
+            group = [pages[i] for i in indexes]
+            try:
+                group_statuses = list(bulk_fn(group) or [])
+            except Exception as e:
+                group_statuses = [e] * len(group)
+            if len(group_statuses) != len(group):
+                group_statuses = [f"upload_pages() returned {len(group_statuses)} results for {len(group)} pages"] * len(group)
+            statuses.update(zip(indexes, group_statuses))
+            continue
+
         if not callable(upload_fn):
+            statuses.update({i: f"upload_page() not implemented for {content_type}" for i in indexes})
+            continue
+
+        for i in indexes:
+            try:
+                statuses[i] = upload_fn(pages[i])
+            except Exception as e:
+                statuses[i] = e
+
+    output = []
+    uploaded = []
+    success_count = 0
+    fail_count = 0
+
+    for index, page in enumerate(pages):
+        page_number = page.get("pageNumber")
+        status = statuses.get(index)
+
+        if status == True or status == "ok":
             output.append({
                 "pageNumber": page_number,
-                "status": "failed",
-                "error": f"upload_page() not implemented for {content_type}"
+                "status": "success"
             })
-            fail_count += 1
-            continue
-
-        try:
-            status = upload_fn(page)
-            if status == True or status == "ok":
-                output.append({
-                    "pageNumber": page_number,
-                    "status": "success"
-                })
-                success_count += 1
-            else:
-                output.append({
-                    "pageNumber": page_number,
-                    "status": "failed",
-                    "error": str(status)
-                })
-                fail_count += 1
-
-        except Exception as e:
+            uploaded.append(page)
+            success_count += 1
+        else:
             output.append({
                 "pageNumber": page_number,
                 "status": "failed",
-                "error": str(e)
+                "error": str(status)
             })
             fail_count += 1
 
+    if _INDEX_UPLOADS and uploaded:
+        try:
+            remember_pages(client_id, uploaded)
+        except Exception:
+            log.exception("Failed to index uploaded pages for %s", client_id)
+
     return {
         "client_id": client_id,
         "uploaded": success_count,
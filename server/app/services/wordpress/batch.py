@@ -0,0 +1,170 @@
+# ================= IMPORTS ==================
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from server.app.services.wordpress.cpt.crud import apply_upsert_, find_posts_by_slugs_, plan_upsert_, send_plan_
+
+log = logging.getLogger(__name__)
+
+# ================= CONSTANTS ==================
+# WordPress caps /batch/v1 at 25 sub-requests per call
+MAX_BATCH = 25
+
+# Per-site answer to "does /batch/v1 exist here?": {domain: bool}
+_BATCH_SUPPORT = {}
+_SUPPORT_LOCK = threading.Lock()
+
+
+# ================= CLASS DEFINITION ==================
+class WordpressBatch:
+    """
+    Collects REST operations (routes relative to /wp-json, e.g. "/wp/v2/learn/12")
+    and sends them through /wp-json/batch/v1, 25 per call. Each operation has a
+    caller-chosen tag (e.g. a page number) so results map back to their source.
+
+    Sites without the batch endpoint (WordPress < 5.6, or blocked), and routes
+    that refuse batching, fall back to one request per operation.
+    """
+
+    def __init__(self, wp, size: int = MAX_BATCH):
+        self.wp = wp
+        self.size = max(1, min(size, MAX_BATCH))
+        self._ops: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def add(self, tag, method: str, route: str, body: Optional[dict] = None, params: Optional[dict] = None) -> None:
+        self._ops.append({"tag": tag, "method": method.upper(), "route": route, "body": body, "params": params})
+
+    def send(self) -> Dict[Any, tuple]:
+        """Returns {tag: (status_code, body)} for every queued operation."""
+        ops, self._ops = self._ops, []
+        results = {}
+        for i in range(0, len(ops), self.size):
+            chunk = ops[i:i + self.size]
+            outcome = self._send_batch(chunk) if self._supported() else None
+            if outcome is None:
+                outcome = [self._send_single(op) for op in chunk]
+            for op, result in zip(chunk, outcome):
+                if result[0] == 400 and _code(result[1]) == "rest_batch_not_allowed":
+                    result = self._send_single(op)
+                results[op["tag"]] = result
+        return results
+
+    # ---------- INTERNAL ----------
+    def _supported(self) -> bool:
+        with _SUPPORT_LOCK:
+            return _BATCH_SUPPORT.get(self.wp.domain, True)
+
+    def _mark_unsupported(self, reason: str) -> None:
+        log.info("Batch API unavailable on %s (%s); using single requests", self.wp.domain, reason)
+        with _SUPPORT_LOCK:
+            _BATCH_SUPPORT[self.wp.domain] = False
+
+    @staticmethod
+    def _path(op: dict) -> str:
+        return op["route"] + (f"?{urlencode(op['params'])}" if op.get("params") else "")
+
+    def _send_batch(self, chunk: List[dict]) -> Optional[List[tuple]]:
+        """
+        One /batch/v1 call. None means the batch certainly never ran (no such
+        endpoint, or no connection) and the caller may send the operations
+        singly; any other failure comes back as an error for every operation.
+        """
+        requests_ = []
+        for op in chunk:
+            sub = {"method": op["method"], "path": self._path(op)}
+            if op.get("body") is not None:
+                sub["body"] = op["body"]
+            requests_.append(sub)
+
+        try:
+            resp = self.wp.session.post(
+                f"{self.wp.domain}wp-json/batch/v1",
+                headers=self.wp.header,
+                json={"validation": "normal", "requests": requests_},
+                timeout=120,
+            )
+        except requests.RequestException as e:
+            if _never_sent(e):
+                log.warning("Batch request to %s could not connect: %s", self.wp.domain, e)
+                return None
+            # e.g. a read timeout: the site may have run the batch, so re-sending could duplicate creates
+            return self._unconfirmed(chunk, f"Batch request failed after sending: {e}")
+
+        if resp.status_code in (404, 405, 501):
+            self._mark_unsupported(f"HTTP {resp.status_code}")
+            return None
+        try:
+            data = resp.json()
+        except ValueError:
+            data = None
+        responses = (data or {}).get("responses") if isinstance(data, dict) else None
+        if resp.status_code not in (200, 207) or not isinstance(responses, list) or len(responses) != len(chunk):
+            return self._unconfirmed(chunk, f"Unexpected batch response: {resp.status_code} - {resp.text[:200]}")
+
+        return [(r.get("status", 0), r.get("body")) for r in responses]
+
+    def _unconfirmed(self, chunk: List[dict], message: str) -> List[tuple]:
+        """Fail every operation of a batch whose outcome is unknown; callers re-plan on retry."""
+        log.warning("%s (%s)", message, self.wp.domain)
+        return [(0, {"code": "batch_unconfirmed", "message": message})] * len(chunk)
+
+    def _send_single(self, op: dict) -> tuple:
+        return send_plan_(self.wp, op)
+
+
+def _never_sent(e: requests.RequestException) -> bool:
+    """True only for failures before the request reached the site (connect errors/timeouts)."""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    # httpx transport (WP_HTTP2): the session chains the original exception
+    if type(e.__cause__).__name__ in ("ConnectError", "ConnectTimeout"):
+        return True
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _code(body) -> Optional[str]:
+    return body.get("code") if isinstance(body, dict) else None
+
+
+def upsert_cpts_(self, rest_base: str, payloads: dict, existing: dict | None = None, meta_mode: str | None = None) -> dict:
+    """
+    Upsert many posts of one type, batching the writes: {tag: payload} ->
+    {tag: upsert result dict, or the Exception that sank that one post}.
+
+    existing: {slug: post or None} if already looked up; otherwise every slug
+    is resolved here in one bulk lookup.
+    """
+    rest_base = rest_base.strip().strip("/")
+    if existing is None:
+        slugs = [p.get("slug") for p in payloads.values()]
+        existing = find_posts_by_slugs_(self, rest_base, slugs) if any(slugs) else {}
+
+    results, plans = {}, {}
+    batch = WordpressBatch(self)
+    for tag, payload in payloads.items():
+        try:
+            plan = plan_upsert_(self, rest_base, payload, meta_mode, existing=existing.get(payload.get("slug")))
+        except Exception as e:
+            results[tag] = e
+            continue
+        if plan["action"] == "unchanged":
+            results[tag] = {"action": "unchanged", "id": plan["id"], "fields": []}
+            continue
+        plans[tag] = plan
+        batch.add(tag, plan["method"], plan["route"], plan["body"], plan["params"])
+
+    for tag, (status, body) in batch.send().items():
+        try:
+            results[tag] = apply_upsert_(self, plans[tag], status, body)
+        except Exception as e:
+            results[tag] = e
+    return results
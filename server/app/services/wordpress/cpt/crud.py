@@ -1,21 +1,62 @@
 import requests
 import logging
+import threading
+import time
 
-def create_cpt_(self, rest_base: str, payload: dict) -> dict:
+from server.app.services.wordpress.meta.meta_content import update_post_meta_, yoast_meta
+from server.app.services.wordpress.cpt.sync_state import content_hash, get_sync_state
+
+# Trim create/update responses to what callers use
+_POST_FIELDS = "id,slug,link,status,meta"
+# Slug lookups: only what upsert needs
+_LOOKUP_FIELDS = "id,slug,status,featured_media"
+_SLUG_CHUNK = 100
+_SLUG_TTL = 300
+# Never changed on update: slug is the lookup key, and re-sending "draft" would unpublish live posts
+_UPSERT_SKIP = {"slug", "status"}
+
+# {(domain, rest_base, slug): (fetched_at, post dict or None)}
+_SLUG_CACHE = {}
+_SLUG_LOCK = threading.Lock()
+
+
+def _unapplied_meta(sent: dict, page_data: dict) -> dict:
+    """Meta keys the response doesn't echo back with the value we sent (e.g. not registered for REST)."""
+    echoed = page_data.get("meta")
+    if not isinstance(echoed, dict):
+        return dict(sent)
+    return {k: v for k, v in sent.items() if str(echoed.get(k, "")) != str(v)}
+
+
+def create_cpt_(self, rest_base: str, payload: dict, meta_mode: str | None = None) -> dict:
+    """
+    Create a post of type `rest_base`.
+
+    meta_title / meta_description in the payload become Yoast meta, merged with
+    any payload["meta"]. With meta_mode "inline" (default) the meta is sent in
+    the create request itself; only keys the site didn't apply are retried with
+    a follow-up meta update. "separate" always uses the follow-up update.
+    """
     if not rest_base:
         raise ValueError("rest_base is required for create_cpt")
 
     rest_base = rest_base.strip().strip("/")
+    meta_mode = meta_mode or self.meta_mode
 
     meta_title = payload.pop("meta_title", None)
     meta_description = payload.pop("meta_description", None)
+    meta = {**(payload.pop("meta", None) or {}), **yoast_meta(meta_title, meta_description)}
+
+    if meta and meta_mode == "inline":
+        payload["meta"] = meta
 
     url = f"{self.url}/{rest_base}"
 
     try:
-        resp = requests.post(
+        resp = self.session.post(
             url,
             headers=self.header,
+            params={"_fields": _POST_FIELDS},
             json=payload,
             timeout=30,
         )
@@ -36,18 +77,210 @@ def create_cpt_(self, rest_base: str, payload: dict) -> dict:
             f"{resp.text[:300]}"
         )
 
-    # Optionally update Yoast meta
-    if (meta_title or meta_description) and hasattr(self, "update_meta_yoast"):
+    # Separate meta update only for what the create didn't apply
+    pending = _unapplied_meta(meta, page_data) if meta_mode == "inline" else meta
+    post_id = page_data.get("id")
+    if pending and post_id:
         try:
-            post_id = page_data.get("id")
-            if post_id:
-                self.update_meta_yoast(
-                    rest_base=rest_base,
-                    post_id=post_id,
-                    meta_description=meta_description,
-                    meta_title=meta_title,
-                )
+            if update_post_meta_(self, rest_base, post_id, pending) and isinstance(page_data.get("meta"), dict):
+                page_data["meta"].update(pending)
         except Exception as e:
-            logging.error(f"Failed to update Yoast meta for CPT {rest_base}: {e}")
+            logging.error(f"Failed to update meta for CPT {rest_base}: {e}")
 
     return page_data
+
+
+def find_posts_by_slugs_(self, rest_base: str, slugs, refresh: bool = False) -> dict:
+    """
+    {slug: post or None} for many slugs at once: the REST `slug` filter takes a
+    list, so up to 100 slugs resolve per request. Answers are cached briefly
+    per site so a batch's pages can share one lookup.
+    """
+    rest_base = rest_base.strip().strip("/")
+    slugs = [s for s in dict.fromkeys(slugs or []) if s]
+    now = time.time()
+
+    found, missing = {}, []
+    with _SLUG_LOCK:
+        for slug in slugs:
+            hit = _SLUG_CACHE.get((self.domain, rest_base, slug))
+            if hit and not refresh and now - hit[0] < _SLUG_TTL:
+                found[slug] = hit[1]
+            else:
+                missing.append(slug)
+
+    for i in range(0, len(missing), _SLUG_CHUNK):
+        chunk = missing[i:i + _SLUG_CHUNK]
+        params = {"slug": ",".join(chunk), "per_page": _SLUG_CHUNK, "status": "any", "_fields": _LOOKUP_FIELDS}
+        resp = self.session.get(f"{self.url}/{rest_base}", headers=self.header, params=params, timeout=20)
+        if resp.status_code == 400:
+            # status=any needs edit rights on this type; published posts are still visible without it
+            params.pop("status")
+            resp = self.session.get(f"{self.url}/{rest_base}", headers=self.header, params=params, timeout=20)
+        if resp.status_code != 200:
+            raise Exception(f"Slug lookup at {rest_base} failed: {resp.status_code} - {resp.text[:300]}")
+
+        posts = {p.get("slug"): p for p in resp.json() or []}
+        with _SLUG_LOCK:
+            for slug in chunk:
+                found[slug] = posts.get(slug)
+                _SLUG_CACHE[(self.domain, rest_base, slug)] = (now, found[slug])
+
+    return found
+
+
+def _forget_slug(self, rest_base: str, slug: str, post: dict | None = None) -> None:
+    with _SLUG_LOCK:
+        if post is None:
+            _SLUG_CACHE.pop((self.domain, rest_base, slug), None)
+        else:
+            _SLUG_CACHE[(self.domain, rest_base, slug)] = (time.time(), post)
+
+
+def _flatten(payload: dict) -> dict:
+    """{"title": ..., "meta._yoast_wpseo_title": ...}: one entry per hashable field."""
+    out = {}
+    for key, value in payload.items():
+        if key == "meta" and isinstance(value, dict):
+            out.update({f"meta.{k}": v for k, v in value.items()})
+        else:
+            out[key] = value
+    return out
+
+
+def _unflatten(fields: dict) -> dict:
+    payload = {}
+    for key, value in fields.items():
+        if key.startswith("meta."):
+            payload.setdefault("meta", {})[key[5:]] = value
+        else:
+            payload[key] = value
+    return payload
+
+
+def update_cpt_(self, rest_base: str, post_id: int, payload: dict) -> dict:
+    """Partial update of an existing post; only the keys in payload are sent."""
+    rest_base = rest_base.strip().strip("/")
+    url = f"{self.url}/{rest_base}/{post_id}"
+
+    try:
+        resp = self.session.post(url, headers=self.header, params={"_fields": _POST_FIELDS}, json=payload, timeout=30)
+    except requests.RequestException as e:
+        raise Exception(f"Request error during update at {rest_base}/{post_id}: {e}")
+
+    if resp.status_code != 200:
+        raise Exception(f"Update at {rest_base}/{post_id} failed: {resp.status_code} - {resp.text[:300]}")
+
+    try:
+        return resp.json()
+    except ValueError:
+        raise Exception(f"Update at {rest_base}/{post_id} returned non-JSON body: {resp.text[:300]}")
+
+
+def plan_upsert_(self, rest_base: str, payload: dict, meta_mode: str | None = None, existing=False) -> dict:
+    """
+    Work out the single request an upsert needs, without sending it:
+      {"action": "create" | "update" | "unchanged", "id", "fields",
+       "method", "route", "params", "body", ...}
+    `route` is relative to /wp-json so the plan can go out alone (send_plan_) or
+    inside a /batch/v1 call; either way finish with apply_upsert_().
+
+    existing: the post for this slug if the caller already looked it up
+    (None = known not to exist); left as False it is looked up here.
+    """
+    rest_base = rest_base.strip().strip("/")
+    meta_mode = meta_mode or self.meta_mode
+    payload = dict(payload)
+    meta = {**(payload.pop("meta", None) or {}),
+            **yoast_meta(payload.pop("meta_title", None), payload.pop("meta_description", None))}
+    if meta:
+        payload["meta"] = meta
+    fields = {k: v for k, v in _flatten(payload).items() if v is not None}
+    hashes = {k: content_hash(v) for k, v in fields.items()}
+
+    slug = payload.get("slug")
+    if existing is False:
+        existing = find_posts_by_slugs_(self, rest_base, [slug]).get(slug) if slug else None
+
+    plan = {"rest_base": rest_base, "slug": slug, "hashes": hashes, "method": "POST",
+            "params": {"_fields": _POST_FIELDS}, "meta": {}, "meta_mode": meta_mode}
+
+    if not existing:
+        body = _unflatten(fields)
+        if meta_mode != "inline":
+            body.pop("meta", None)
+        plan.update(action="create", id=None, fields=sorted(fields), route=f"/wp/v2/{rest_base}",
+                    body=body, meta=meta)
+        return plan
+
+    post_id = existing["id"]
+    previous = get_sync_state().get(self.domain, rest_base, post_id)
+    changed = {
+        k: v for k, v in fields.items()
+        if k not in _UPSERT_SKIP and previous.get(k) != hashes[k]
+    }
+    plan.update(action="update" if changed else "unchanged", id=post_id, fields=sorted(changed),
+                route=f"/wp/v2/{rest_base}/{post_id}", body=_unflatten(changed))
+    return plan
+
+
+def send_plan_(self, plan: dict):
+    """Send one planned request on its own; returns (status_code, body)."""
+    try:
+        resp = self.session.request(plan["method"], f"{self.domain}wp-json{plan['route']}",
+                                    headers=self.header, params=plan.get("params"), json=plan.get("body"), timeout=30)
+    except requests.RequestException as e:
+        return 0, {"message": str(e)}
+    try:
+        return resp.status_code, resp.json()
+    except ValueError:
+        return resp.status_code, {"message": resp.text[:300]}
+
+
+def apply_upsert_(self, plan: dict, status: int, body) -> dict:
+    """
+    Record the outcome of a sent plan: sync hashes, slug cache and (for creates)
+    any meta the create didn't apply. Raises on a failed request.
+    """
+    rest_base, action = plan["rest_base"], plan["action"]
+    if status not in (200, 201):
+        if plan["slug"]:
+            # the write may still have landed: look the slug up again before any retry
+            _forget_slug(self, rest_base, plan["slug"])
+        message = body.get("message") if isinstance(body, dict) else body
+        raise Exception(f"{action.capitalize()} at {rest_base} failed: {status} - {str(message)[:300]}")
+
+    post = body if isinstance(body, dict) else {}
+    post_id = post.get("id") or plan["id"]
+    state = get_sync_state()
+
+    if action == "create":
+        meta = plan["meta"]
+        pending = _unapplied_meta(meta, post) if plan["meta_mode"] == "inline" else meta
+        if pending and post_id and not update_post_meta_(self, rest_base, post_id, pending):
+            # leave those keys unrecorded so the next upsert retries them
+            plan["hashes"] = {k: h for k, h in plan["hashes"].items()
+                             if not (k.startswith("meta.") and k[5:] in pending)}
+        if post_id:
+            state.set(self.domain, rest_base, post_id, plan["hashes"])
+            if plan["slug"]:
+                _forget_slug(self, rest_base, plan["slug"], {"id": post_id, "slug": plan["slug"]})
+        return {"action": "created", "id": post_id, "fields": plan["fields"], "post": post}
+
+    state.set(self.domain, rest_base, post_id, {k: plan["hashes"][k] for k in plan["fields"]})
+    return {"action": "updated", "id": post_id, "fields": plan["fields"], "post": post}
+
+
+def upsert_cpt_(self, rest_base: str, payload: dict, meta_mode: str | None = None) -> dict:
+    """
+    Create the post, or update the existing one with the same slug. On update
+    only fields whose content hash changed since our last sync are sent, and
+    slug/status are left alone.
+
+    Returns {"action": "created" | "updated" | "unchanged", "id": ..., "fields": [...]}.
+    """
+    plan = plan_upsert_(self, rest_base, payload, meta_mode)
+    if plan["action"] == "unchanged":
+        return {"action": "unchanged", "id": plan["id"], "fields": []}
+    status, body = send_plan_(self, plan)
+    return apply_upsert_(self, plan, status, body)
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+_DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "streamline_wp_sync.sqlite3")
+
+
+def content_hash(value) -> str:
+    blob = value if isinstance(value, str) else json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SyncState:
+    """
+    Last-synced content hash per (site, post type, post id, field), so an upsert
+    only sends fields whose content actually changed since we last wrote them.
+
+    Env:
+      WP_SYNC_STATE_PATH  sqlite file; "off" disables (every update sends all fields)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or os.getenv("WP_SYNC_STATE_PATH") or _DEFAULT_PATH
+        self.enabled = path.lower() != "off"
+        self._lock = threading.Lock()
+        self._db = None
+        if self.enabled:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS field_hashes ("
+                    " site TEXT NOT NULL, rest_base TEXT NOT NULL, post_id INTEGER NOT NULL,"
+                    " field TEXT NOT NULL, hash TEXT NOT NULL,"
+                    " PRIMARY KEY (site, rest_base, post_id, field))"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                log.warning("WordPress sync state disabled (%s): %s", path, e)
+                self.enabled = False
+                self._db = None
+
+    def get(self, site: str, rest_base: str, post_id: int) -> Dict[str, str]:
+        if not self.enabled:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT field, hash FROM field_hashes WHERE site = ? AND rest_base = ? AND post_id = ?",
+                (site, rest_base, post_id),
+            ).fetchall()
+        return dict(rows)
+
+    def set(self, site: str, rest_base: str, post_id: int, hashes: Dict[str, str]) -> None:
+        if not self.enabled or not hashes:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO field_hashes (site, rest_base, post_id, field, hash) VALUES (?, ?, ?, ?, ?)",
+                [(site, rest_base, post_id, field, h) for field, h in hashes.items()],
+            )
+            self._db.commit()
+
+
+_SHARED_STATE = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_sync_state() -> SyncState:
+    with _SHARED_LOCK:
+        if "state" not in _SHARED_STATE:
+            _SHARED_STATE["state"] = SyncState()
+        return _SHARED_STATE["state"]
@@ -1,15 +1,21 @@
 
 # ================= IMPORTS ==================
 import requests
+import logging
 import os
-from concurrent.futures import ThreadPoolExecutor
+
+from server.app.utils.formatters.media import guess_mime, spool_file, transcode, with_extension
+from server.app.services.wordpress.media.media_index import file_hash, get_media_index
 
 # ================= FUNCTIONS ==================
 def delete_media_(self, id):
     # integration
     endpoint = f"{self.url}/media/{id}?force=true"
     try:
-        response = requests.delete(endpoint, headers=self.header)
+        response = self.session.delete(endpoint, headers=self.header)
+        if response.status_code in [200, 204, 404, 410]:
+            # gone either way: uploads must not reuse it through the content index
+            get_media_index().forget(self.domain, [id])
         if response.status_code in [200, 204]:
             print(f"Media ID {id} successfully deleted.")
             return response.json()
@@ -20,46 +26,11 @@ def delete_media_(self, id):
         print(f"An error occurred while deleting Media ID {id}: {e}")
         return {"error": str(e)}
     
-def delete_medias_(self):
-    per_page = 100
-    page = 1
-    total_deleted = 0
-
-    while True:
-        endpoint = f"{self.url}/media"
-        params = {"per_page": per_page, "page": page}
-
-        try:
-            response = requests.get(endpoint, headers=self.header, params=params)
-            if response.status_code in [200, 204]:
-                media_items = response.json()
-                if not media_items:
-                    break
-
-                print(f"\nProcessing page {page} with {len(media_items)} items")
-                media_ids = [media['id'] for media in media_items]
-
-                # Concurrent deletion of media items
-                with ThreadPoolExecutor(max_workers=10) as executor:
-                    results = list(executor.map(self.delete_media, media_ids))
-                    total_deleted += sum(1 for result in results if result)
-
-                page += 1
-            else:
-                print(f"Failed to fetch media page {page}: {response.status_code}")
-                break
-
-        except requests.RequestException as e:
-            print(f"Error on page {page}: {e}")
-            break
-
-    print(f"\nTotal media items deleted: {total_deleted}")
-
 def get_media_(self, media_id):
     """Retrieve media details by ID."""
     endpoint = f"{self.url}/media/{media_id}"
     try:
-        response = requests.get(endpoint, headers=self.header)
+        response = self.session.get(endpoint, headers=self.header)
         if response.status_code in [200, 204]:
             return response.json()
         else:
@@ -69,19 +40,24 @@ def get_media_(self, media_id):
         print(f"Error fetching media ID {media_id}: {e}")
         return None
 
+def _post_file(self, endpoint, file_path, filename, mime, params=None, timeout=60):
+    """POST a file as the raw request body; the session streams it from disk in chunks."""
+    headers = self.header.copy()
+    headers["Content-Type"] = mime
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    with open(file_path, "rb") as file:
+        return self.session.post(endpoint, headers=headers, data=file, params=params, timeout=timeout)
+
 def replace_media_(self, media_id, file_path):
     filename = os.path.basename(file_path)
     endpoint = f"{self.url}/media/{media_id}"
 
-    headers = self.header.copy()
-    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    with open(file_path, "rb") as file:
-        files = {"file": (filename, file, "image/jpeg")}  # Change MIME type if needed
-        response = requests.post(endpoint, headers=headers, files=files)
+    response = _post_file(self, endpoint, file_path, filename, guess_mime(file_path, "image/jpeg"))
 
     if response.status_code in [200, 204]:
         media_data = response.json()
+        # old content hash no longer describes this attachment
+        get_media_index().forget(self.domain, [media_id])
         print(f"Media ID {media_id} updated successfully: {media_data.get('source_url')}")
         return media_data
     else:
@@ -89,43 +65,55 @@ def replace_media_(self, media_id, file_path):
         return None
 
 
-def upload_media_from_bytes_(
+def upload_media_file_(
         self,
-        img_bytes: bytes,
-        filename: str,
-        mime: str = "image/png",
+        file_path: str,
+        filename: str | None = None,
+        mime: str | None = None,
         title: str | None = None,
         alt_text: str | None = None,
+        optimise: bool = True,
+        dedupe: bool = True,
     ) -> int:
         """
-        Upload an image to WordPress media library from raw bytes.
+        Upload an image file to the WordPress media library.
+        With optimise=True it is first resized/re-encoded (MEDIA_FORMAT, default
+        WebP) into a spool file; the result is streamed from disk, never buffered.
+        With dedupe=True a file whose content was already uploaded to this site
+        returns the existing media ID without sending anything.
         Returns the media ID on success, or raises on failure.
         """
         endpoint = f"{self.url}/media"
-
-        headers = self.header.copy()
-        # Do NOT set Content-Type manually; requests will handle multipart boundary.
-
-        data = {}
+        filename = filename or os.path.basename(file_path)
+
+        index = get_media_index()
+        content_hash = file_hash(file_path) if dedupe and index.enabled else None
+        if content_hash:
+            existing_id = index.get(self.domain, content_hash)
+            if existing_id:
+                logging.info(f"Reusing media ID {existing_id} for {filename} (same content already uploaded)")
+                return existing_id
+
+        upload_path, is_temp = file_path, False
+        if optimise:
+            upload_path, mime, is_temp = transcode(file_path)
+            filename = with_extension(filename, upload_path)
+        mime = mime or guess_mime(upload_path, "image/png")
+
+        # title/alt_text go in the query string so the body can be the raw file
+        params = {}
         if title:
-            data["title"] = title
+            params["title"] = title
         if alt_text:
-            data["alt_text"] = alt_text
-
-        files = {
-            "file": (filename, img_bytes, mime),
-        }
+            params["alt_text"] = alt_text
 
         try:
-            resp = requests.post(
-                endpoint,
-                headers=headers,
-                files=files,
-                data=data,
-                timeout=60,
-            )
+            resp = _post_file(self, endpoint, upload_path, filename, mime, params=params)
         except requests.RequestException as e:
             raise Exception(f"Media upload request error: {e}")
+        finally:
+            if is_temp:
+                os.remove(upload_path)
 
         if resp.status_code not in (200, 201):
             raise Exception(
@@ -143,4 +131,28 @@ def upload_media_from_bytes_(
         if not media_id:
             raise Exception(f"Media upload response missing 'id': {media_data}")
 
-        return media_id
\ No newline at end of file
+        if content_hash:
+            index.set(self.domain, content_hash, media_id)
+        return media_id
+
+
+def upload_media_from_bytes_(
+        self,
+        img_bytes: bytes,
+        filename: str,
+        mime: str = "image/png",
+        title: str | None = None,
+        alt_text: str | None = None,
+    ) -> int:
+        """
+        Upload an image to WordPress media library from raw bytes.
+        The bytes are spooled to disk and sent through upload_media_file_.
+        Returns the media ID on success, or raises on failure.
+        """
+        path = spool_file(os.path.splitext(filename)[1])
+        try:
+            with open(path, "wb") as f:
+                f.write(img_bytes)
+            return upload_media_file_(self, path, filename, mime, title, alt_text)
+        finally:
+            os.remove(path)
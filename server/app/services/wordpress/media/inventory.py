@@ -0,0 +1,218 @@
+# ================= IMPORTS ==================
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from server.app.services.wordpress.media.crud import replace_media_
+from server.app.services.wordpress.media.media_index import file_hash, get_media_index
+
+# ================= CONSTANTS ==================
+_PER_PAGE = 100
+# Listing and delete/replace concurrency; keep at or below WP_POOL_SIZE
+_WORKERS = int(os.getenv("WP_MEDIA_WORKERS") or 8)
+_LIST_FIELDS = "id"
+# Log progress every N finished items when no callback is given
+_LOG_EVERY = 500
+
+
+# ================= FUNCTIONS ==================
+def _fetch_media_page(self, page: int, fields: str, params: dict | None):
+    query = {"per_page": _PER_PAGE, "page": page, "_fields": fields, "orderby": "id", "order": "asc"}
+    query.update(params or {})
+    resp = self.session.get(f"{self.url}/media", headers=self.header, params=query, timeout=30)
+    if resp.status_code != 200:
+        raise requests.HTTPError(f"Media listing page {page} failed: {resp.status_code} - {resp.text[:200]}")
+    return resp
+
+
+def iter_media_(self, fields: str = _LIST_FIELDS, params: dict | None = None, workers: int | None = None):
+    """
+    Yield every media item (trimmed to `fields`) page by page. The first page
+    gives X-WP-TotalPages; the remaining pages are fetched concurrently and
+    yielded as they arrive, so callers can start work before the listing ends.
+    """
+    first = _fetch_media_page(self, 1, fields, params)
+    total_pages = int(first.headers.get("X-WP-TotalPages") or 1)
+    yield from first.json() or []
+
+    if total_pages <= 1:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers or _WORKERS, total_pages - 1))) as executor:
+        futures = [executor.submit(_fetch_media_page, self, p, fields, params) for p in range(2, total_pages + 1)]
+        for fut in as_completed(futures):
+            yield from fut.result().json() or []
+
+
+def list_media_(self, fields: str = _LIST_FIELDS, params: dict | None = None, workers: int | None = None) -> list:
+    """Whole media inventory as a list, sorted by id."""
+    return sorted(iter_media_(self, fields, params, workers), key=lambda m: m.get("id") or 0)
+
+
+class _Progress:
+    """Thread-safe done/failed counter that reports through a callback or the log."""
+
+    def __init__(self, label: str, total: int, callback=None):
+        self.label, self.total, self.callback = label, total, callback
+        self.done, self.failed = 0, []
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tick(self, item_id, ok: bool) -> None:
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed.append(item_id)
+            done, total = self.done, self.total
+        if self.callback:
+            self.callback(done, total)
+        elif done % _LOG_EVERY == 0 or done == total:
+            logging.info(f"{self.label}: {done}/{total} ({len(self.failed)} failed, {time.monotonic() - self.started:.0f}s)")
+
+
+def _run_bounded(fn, items, workers: int, progress: _Progress) -> None:
+    """
+    Run fn(item) -> bool over items with at most `workers` in flight; items
+    can be a generator, it is consumed only as fast as the pool drains.
+    """
+    slots = threading.BoundedSemaphore(workers)
+
+    def _task(item):
+        try:
+            ok = bool(fn(item))
+        except Exception as e:
+            logging.error(f"{progress.label} failed for {item!r}: {e}")
+            ok = False
+        finally:
+            slots.release()
+        progress.tick(item, ok)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item in items:
+            slots.acquire()
+            executor.submit(_task, item)
+
+
+def _delete_one(self, media_id) -> bool:
+    resp = self.session.delete(f"{self.url}/media/{media_id}", headers=self.header, params={"force": "true"}, timeout=30)
+    # 404/410: already gone (an earlier round or another run)
+    if resp.status_code in (200, 204, 404, 410):
+        return True
+    logging.error(f"Failed to delete Media ID {media_id}: {resp.status_code} - {resp.text[:200]}")
+    return False
+
+
+def purge_media_(self, ids=None, params: dict | None = None, workers: int | None = None, progress=None, max_rounds: int = 3) -> dict:
+    """
+    Delete media: the given ids, or everything the listing returns (narrowed
+    with REST filters in `params`, e.g. {"media_type": "image", "parent": 0}).
+
+    The listing is taken as an id snapshot before anything is deleted (deleting
+    while paging shifts later pages and skips items); the snapshot loads its
+    pages concurrently, then ids are streamed through a bounded delete pool.
+    Whole-library purges repeat until a fresh listing comes back empty (at
+    most max_rounds). progress(done, total) is called after every item.
+
+    Returns {"listed": int, "deleted": int, "failed": [ids], "seconds": float}.
+    """
+    workers = max(1, workers or _WORKERS)
+    started = time.monotonic()
+    summary = {"listed": 0, "deleted": 0, "failed": [], "seconds": 0.0}
+
+    rounds = 1 if ids is not None else max(1, max_rounds)
+    for _ in range(rounds):
+        if ids is not None:
+            batch = list(dict.fromkeys(ids))
+        else:
+            batch = [m["id"] for m in iter_media_(self, "id", params, workers) if m.get("id")]
+            skip = set(summary["failed"])
+            batch = [i for i in dict.fromkeys(batch) if i not in skip]
+        if not batch:
+            break
+
+        tracker = _Progress("Media purge", len(batch), progress)
+        _run_bounded(lambda media_id: _delete_one(self, media_id), batch, workers, tracker)
+
+        get_media_index().forget(self.domain, set(batch) - set(tracker.failed))
+        summary["listed"] += len(batch)
+        summary["deleted"] += tracker.done - len(tracker.failed)
+        summary["failed"].extend(tracker.failed)
+
+    summary["seconds"] = round(time.monotonic() - started, 2)
+    logging.info(f"Media purge on {self.domain}: {summary['deleted']} deleted, {len(summary['failed'])} failed in {summary['seconds']}s")
+    return summary
+
+
+def _existing_ids(self, ids: list) -> set:
+    resp = self.session.get(
+        f"{self.url}/media",
+        headers=self.header,
+        params={"include": ",".join(map(str, ids)), "per_page": _PER_PAGE, "_fields": "id"},
+        timeout=30,
+    )
+    if resp.status_code != 200:
+        raise requests.HTTPError(f"Media lookup failed: {resp.status_code} - {resp.text[:200]}")
+    return {m.get("id") for m in resp.json() or []}
+
+
+def verify_media_index_(self, ids=None, workers: int | None = None) -> dict:
+    """
+    Check media ids from the local content index against /media (100 ids per
+    request, concurrently) and drop the ones that are gone, so dedupe never
+    hands out a deleted attachment. `ids` limits the check to those entries;
+    without it every id indexed for the site is checked (maintenance).
+    Returns {"checked": int, "missing": [ids]}.
+    """
+    index = get_media_index()
+    indexed = set(index.all(self.domain).values())
+    ids = sorted(indexed if ids is None else indexed & set(ids))
+    chunks = [ids[i:i + _PER_PAGE] for i in range(0, len(ids), _PER_PAGE)]
+
+    found = set()
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers or _WORKERS, len(chunks)))) as executor:
+            for existing in executor.map(lambda chunk: _existing_ids(self, chunk), chunks):
+                found |= existing
+
+    missing = [i for i in ids if i not in found]
+    index.forget(self.domain, missing)
+    if missing:
+        logging.info(f"Media index for {self.domain}: dropped {len(missing)} of {len(ids)} missing attachments")
+    return {"checked": len(ids), "missing": missing}
+
+
+def verify_media_files_(self, paths, workers: int | None = None) -> dict:
+    """Verify only the index entries the given files would reuse on upload."""
+    index = get_media_index()
+    ids = set()
+    for path in paths:
+        media_id = index.get(self.domain, file_hash(path)) if path and index.enabled else None
+        if media_id:
+            ids.add(media_id)
+    if not ids:
+        return {"checked": 0, "missing": []}
+    return verify_media_index_(self, ids, workers)
+
+
+def delete_medias_(self):
+    """Delete the whole media library."""
+    return purge_media_(self)
+
+
+def replace_medias_(self, replacements: dict, workers: int | None = None, progress=None) -> dict:
+    """
+    Replace the files of many attachments, {media_id: file_path}, through the
+    same bounded pool. Returns {"replaced": int, "failed": [ids], "seconds": float}.
+    """
+    workers = max(1, workers or _WORKERS)
+    started = time.monotonic()
+    tracker = _Progress("Media replace", len(replacements), progress)
+    _run_bounded(lambda media_id: replace_media_(self, media_id, replacements[media_id]), list(replacements), workers, tracker)
+    return {
+        "replaced": tracker.done - len(tracker.failed),
+        "failed": tracker.failed,
+        "seconds": round(time.monotonic() - started, 2),
+    }
@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Iterable, Optional
+
+log = logging.getLogger(__name__)
+
+_DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "streamline_wp_media.sqlite3")
+_CHUNK = 1024 * 1024
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class MediaIndex:
+    """
+    Content hash -> WordPress media id, per site, so the same image is only
+    ever uploaded once: retries and re-syncs reuse the existing attachment.
+
+    Env:
+      WP_MEDIA_INDEX_PATH  sqlite file; "off" disables (every upload is sent)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or os.getenv("WP_MEDIA_INDEX_PATH") or _DEFAULT_PATH
+        self.enabled = path.lower() != "off"
+        self._lock = threading.Lock()
+        self._db = None
+        if self.enabled:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS media ("
+                    " site TEXT NOT NULL, hash TEXT NOT NULL, media_id INTEGER NOT NULL,"
+                    " PRIMARY KEY (site, hash))"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS media_by_id ON media (site, media_id)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                log.warning("WordPress media index disabled (%s): %s", path, e)
+                self.enabled = False
+                self._db = None
+
+    def get(self, site: str, content_hash: str) -> Optional[int]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT media_id FROM media WHERE site = ? AND hash = ?", (site, content_hash)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, site: str, content_hash: str, media_id: int) -> None:
+        if not self.enabled or not media_id:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO media (site, hash, media_id) VALUES (?, ?, ?)",
+                (site, content_hash, media_id),
+            )
+            self._db.commit()
+
+    def all(self, site: str) -> Dict[str, int]:
+        if not self.enabled:
+            return {}
+        with self._lock:
+            rows = self._db.execute("SELECT hash, media_id FROM media WHERE site = ?", (site,)).fetchall()
+        return dict(rows)
+
+    def forget(self, site: str, media_ids: Iterable[int]) -> int:
+        """Drop entries pointing at media ids that no longer exist; returns how many."""
+        ids = [(site, int(i)) for i in media_ids]
+        if not self.enabled or not ids:
+            return 0
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("DELETE FROM media WHERE site = ? AND media_id = ?", ids)
+            self._db.commit()
+            return self._db.total_changes - before
+
+
+_SHARED_INDEX = {}
+_SHARED_LOCK = threading.Lock()
+
+def get_media_index() -> MediaIndex:
+    with _SHARED_LOCK:
+        if "index" not in _SHARED_INDEX:
+            _SHARED_INDEX["index"] = MediaIndex()
+        return _SHARED_INDEX["index"]
@@ -1,19 +1,18 @@
 import requests
 import logging
 
-def find_author_id_(self, name: str):
-    """
-    Best-effort: find WP user ID by searching the users endpoint.
-    Returns user ID int or None.
-    """
-    if not name:
-        return None
+from server.app.services.wordpress.meta.directory import (
+    get_directory_, normalize_name, remember_directory_entry_, resolve_name_,
+)
 
+
+def _search_users(self, name: str):
+    """Fallback for users missing from the bulk listing: one search, exact (normalized) match only."""
     try:
-        resp = requests.get(
+        resp = self.session.get(
             f"{self.url}/users",
             headers=self.header,
-            params={"search": name},
+            params={"search": name, "_fields": "id,name,slug"},
             timeout=20,
         )
     except requests.RequestException as e:
@@ -32,8 +31,45 @@ def find_author_id_(self, name: str):
         logging.error(f"User search returned non-JSON for '{name}'")
         return None
 
-    if not users:
+    # Only a real name/slug match counts: the search also returns partial
+    # matches ("Bob" finds "Bobby Smith"), and a wrong author is worse than none
+    wanted = normalize_name(name)
+    for user in users or []:
+        if wanted in (normalize_name(user.get("name")), normalize_name(user.get("slug"))):
+            return user
+    return None
+
+
+def find_author_id_(self, name: str):
+    """
+    Find a WP user ID by name. Resolved locally against the site's cached user
+    directory (exact, then normalized match); only unknown names hit the
+    search endpoint, and the answer (or miss) is remembered for the batch.
+    Returns user ID int or None.
+    """
+    if not name:
+        return None
+
+    found = resolve_name_(self, "users", name)
+    if found is not None:
+        return found
+
+    try:
+        misses = get_directory_(self, "users").setdefault("misses", set())
+    except (requests.RequestException, ValueError):
+        misses = set()
+    if normalize_name(name) in misses:
+        return None
+
+    user = _search_users(self, name)
+    if user is None:
+        misses.add(normalize_name(name))
         return None
 
-    # naive: first match
-    return users[0].get("id")
+    remember_directory_entry_(self, "users", user)
+    return user.get("id")
+
+
+def find_term_id_(self, taxonomy: str, name: str):
+    """Category/tag ID by name from the cached site directory ('categories' or 'tags')."""
+    return resolve_name_(self, taxonomy, name)
@@ -0,0 +1,125 @@
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# kind -> REST collection and the fields we keep
+_KINDS = {
+    "users": "id,name,slug",
+    "categories": "id,name,slug",
+    "tags": "id,name,slug",
+}
+_PER_PAGE = 100
+_PAGE_WORKERS = 4
+_TTL = int(os.getenv("WP_DIRECTORY_TTL") or 600)
+
+# {(domain, kind): {"loaded_at": float, "entries": [...], "by_exact": {}, "by_norm": {}}}
+_DIRECTORIES = {}
+_LOCKS = {}
+_LOCKS_LOCK = threading.Lock()
+
+
+def normalize_name(value: str) -> str:
+    """Case/accent/punctuation-insensitive form: "José  O'Neil" -> "jose o neil"."""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    value = re.sub(r"[^0-9a-z]+", " ", value.casefold())
+    return value.strip()
+
+
+def _lock_for(key) -> threading.Lock:
+    with _LOCKS_LOCK:
+        return _LOCKS.setdefault(key, threading.Lock())
+
+
+def _fetch_page(self, kind: str, page: int):
+    return self.session.get(
+        f"{self.url}/{kind}",
+        headers=self.header,
+        params={"per_page": _PER_PAGE, "page": page, "_fields": _KINDS[kind]},
+        timeout=20,
+    )
+
+
+def _load_all(self, kind: str) -> list:
+    """Every entry of a collection: first page tells us X-WP-TotalPages, the rest load concurrently."""
+    first = _fetch_page(self, kind, 1)
+    if first.status_code != 200:
+        raise requests.HTTPError(f"{kind} listing failed: {first.status_code} - {first.text[:200]}")
+    entries = list(first.json() or [])
+
+    total_pages = int(first.headers.get("X-WP-TotalPages") or 1)
+    if total_pages > 1:
+        with ThreadPoolExecutor(max_workers=min(_PAGE_WORKERS, total_pages - 1)) as executor:
+            for resp in executor.map(lambda p: _fetch_page(self, kind, p), range(2, total_pages + 1)):
+                if resp.status_code != 200:
+                    raise requests.HTTPError(f"{kind} listing failed: {resp.status_code} - {resp.text[:200]}")
+                entries.extend(resp.json() or [])
+    return entries
+
+
+def _index(entries: list) -> dict:
+    by_exact, by_norm = {}, {}
+    for e in entries:
+        for label in (e.get("name"), e.get("slug")):
+            if label:
+                by_exact.setdefault(label, e["id"])
+                by_norm.setdefault(normalize_name(label), e["id"])
+    return {"loaded_at": time.time(), "entries": entries, "by_exact": by_exact, "by_norm": by_norm}
+
+
+def get_directory_(self, kind: str, refresh: bool = False) -> dict:
+    """Cached (per site, TTL WP_DIRECTORY_TTL) index of users/categories/tags."""
+    if kind not in _KINDS:
+        raise ValueError(f"Unsupported directory: {kind}")
+    key = (self.domain, kind)
+
+    directory = _DIRECTORIES.get(key)
+    if directory and not refresh and time.time() - directory["loaded_at"] < _TTL:
+        return directory
+
+    with _lock_for(key):
+        # another thread may have loaded it while we waited
+        directory = _DIRECTORIES.get(key)
+        if directory and not refresh and time.time() - directory["loaded_at"] < _TTL:
+            return directory
+        directory = _index(_load_all(self, kind))
+        _DIRECTORIES[key] = directory
+        logging.info(f"Loaded {len(directory['entries'])} {kind} for {self.domain}")
+        return directory
+
+
+def remember_directory_entry_(self, kind: str, entry: dict) -> None:
+    """Add an entry found/created outside the bulk load (e.g. a new term) to the cached index."""
+    directory = _DIRECTORIES.get((self.domain, kind))
+    if not directory or not entry.get("id"):
+        return
+    directory["entries"].append(entry)
+    for label in (entry.get("name"), entry.get("slug")):
+        if label:
+            directory["by_exact"].setdefault(label, entry["id"])
+            directory["by_norm"].setdefault(normalize_name(label), entry["id"])
+
+
+def resolve_name_(self, kind: str, name: str):
+    """
+    ID for `name` in a site directory: exact name/slug first, then the
+    normalized form. Returns None when there is no match (or the listing fails).
+    """
+    if not name:
+        return None
+    try:
+        directory = get_directory_(self, kind)
+    except (requests.RequestException, ValueError) as e:
+        logging.error(f"Could not load {kind} for {self.domain}: {e}")
+        return None
+
+    found = directory["by_exact"].get(name.strip())
+    if found is None:
+        found = directory["by_norm"].get(normalize_name(name))
+    return found
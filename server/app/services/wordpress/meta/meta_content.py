@@ -11,7 +11,7 @@ def get_existing_meta_(self, rest_base: str, post_id: int) -> dict:
     endpoint = f"{self.url}/{rest_base}/{post_id}"
 
     try:
-        response = requests.get(endpoint, headers=self.header, timeout=20)
+        response = self.session.get(endpoint, headers=self.header, timeout=20)
     except requests.RequestException as e:
         logging.error(f"Error fetching existing meta from {endpoint}: {e}")
         return {}
@@ -36,39 +36,33 @@ def get_existing_meta_(self, rest_base: str, post_id: int) -> dict:
     return existing_meta
 
 
-def update_meta_yoast_(self, rest_base: str, post_id: int,
-                       meta_description: str | None,
-                       meta_title: str | None) -> bool:
-    """
-    Update Yoast meta for a CPT or core type.
+def yoast_meta(meta_title: str | None, meta_description: str | None) -> dict:
+    """Yoast meta keys for the values we actually have."""
+    meta = {}
+    if meta_title:
+        meta["_yoast_wpseo_title"] = meta_title
+    if meta_description:
+        meta["_yoast_wpseo_metadesc"] = meta_description
+    return meta
 
-    rest_base: 'learn', 'pages', 'posts', etc.
+
+def update_post_meta_(self, rest_base: str, post_id: int, meta: dict) -> bool:
+    """
+    Write only the given meta keys. The REST API updates meta per key, so there
+    is no need to read the post first or send back the meta it already has.
     """
     rest_base = rest_base.strip().strip("/")
     endpoint = f"{self.url}/{rest_base}/{post_id}"
 
-    existing_meta = self.get_existing_meta(rest_base, post_id)
-
-    # Start with a copy to avoid mutating original
-    updated_meta = dict(existing_meta)
-
-    # Only overwrite fields if we actually have values
-    if meta_title:
-        updated_meta["_yoast_wpseo_title"] = meta_title
-    if meta_description:
-        updated_meta["_yoast_wpseo_metadesc"] = meta_description
-
-    # If we still have no meta keys and no new values, do nothing
-    if not updated_meta:
-        logging.info(f"No Yoast meta to update for {rest_base}/{post_id}")
+    if not meta:
+        logging.info(f"No meta to update for {rest_base}/{post_id}")
         return True
 
-    update_payload = {"meta": updated_meta}
-
     try:
-        update_response = requests.post(  # PUT also works; POST is okay for update here
+        update_response = self.session.post(  # PUT also works; POST is okay for update here
             endpoint,
-            json=update_payload,
+            params={"_fields": "id,meta"},
+            json={"meta": meta},
             headers=self.header,
             timeout=20,
         )
@@ -84,3 +78,14 @@ def update_meta_yoast_(self, rest_base: str, post_id: int,
             f"- {update_response.text[:200]}"
         )
         return False
+
+
+def update_meta_yoast_(self, rest_base: str, post_id: int,
+                       meta_description: str | None,
+                       meta_title: str | None) -> bool:
+    """
+    Update Yoast meta for a CPT or core type.
+
+    rest_base: 'learn', 'pages', 'posts', etc.
+    """
+    return update_post_meta_(self, rest_base, post_id, yoast_meta(meta_title, meta_description))
@@ -0,0 +1,100 @@
+# ================= IMPORTS ==================
+import logging
+import os
+import threading
+import importlib.util
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+log = logging.getLogger(__name__)
+
+# ================= CONSTANTS ==================
+_CONNECT_TIMEOUT = float(os.getenv("WP_CONNECT_TIMEOUT") or 5)
+_READ_TIMEOUT = float(os.getenv("WP_READ_TIMEOUT") or 30)
+# Sized for concurrent uploads/deletes against one site
+_POOL_SIZE = int(os.getenv("WP_POOL_SIZE") or 16)
+# HTTP/2 needs httpx with the h2 extra; silently falls back to HTTP/1.1 keep-alive
+_HTTP2 = (os.getenv("WP_HTTP2") or "").strip().lower() in ("1", "true", "yes")
+
+# One session per site, shared by every WordpressHelper: {domain: WordpressSession}
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+# ================= CLASS DEFINITION ==================
+class WordpressSession:
+    """
+    Pooled keep-alive HTTP client for one WordPress site, with default
+    (connect, read) timeouts on every call. Mirrors the requests API used by the
+    wordpress functions (get/post/delete with headers/params/json/data/timeout)
+    and always raises requests.RequestException subclasses on transport errors.
+    """
+
+    def __init__(self, http2: bool = _HTTP2):
+        self.http2 = http2 and importlib.util.find_spec("httpx") is not None and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            log.warning("WP_HTTP2 requested but httpx[http2] is not installed; using HTTP/1.1")
+
+        if self.http2:
+            import httpx
+            self._httpx = httpx
+            self._client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=_POOL_SIZE, max_keepalive_connections=_POOL_SIZE),
+                timeout=httpx.Timeout(_READ_TIMEOUT, connect=_CONNECT_TIMEOUT),
+            )
+        else:
+            self._client = requests.Session()
+            # Only idempotent calls are retried, and only on connection-level failures
+            retry = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3,
+                          allowed_methods=frozenset({"GET", "HEAD", "DELETE"}))
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_POOL_SIZE, max_retries=retry)
+            self._client.mount("https://", adapter)
+            self._client.mount("http://", adapter)
+
+    @staticmethod
+    def _timeout(timeout):
+        if timeout is None:
+            return (_CONNECT_TIMEOUT, _READ_TIMEOUT)
+        if isinstance(timeout, (int, float)):
+            return (_CONNECT_TIMEOUT, float(timeout))
+        return timeout
+
+    def request(self, method: str, url: str, *, headers=None, params=None, json=None, data=None, timeout=None):
+        connect, read = self._timeout(timeout)
+        if not self.http2:
+            return self._client.request(method, url, headers=headers, params=params, json=json,
+                                        data=data, timeout=(connect, read))
+
+        kwargs = {"headers": headers, "params": params, "json": json,
+                  "timeout": self._httpx.Timeout(read, connect=connect)}
+        if data is not None:
+            # files/bytes are streamed as the raw body; dicts are form-encoded
+            kwargs["data" if isinstance(data, dict) else "content"] = data
+        try:
+            return self._client.request(method, url, **kwargs)
+        except self._httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except self._httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+def get_session(domain: str) -> WordpressSession:
+    """Shared session for a site, so consecutive helpers/pages reuse warm connections."""
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(domain)
+        if session is None:
+            session = WordpressSession()
+            _SESSIONS[domain] = session
+        return session
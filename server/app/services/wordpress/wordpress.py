@@ -2,12 +2,17 @@
 import base64
 import requests
 
-from server.app.services.wordpress.media.crud import delete_media_, delete_medias_, get_media_, replace_media_, upload_media_from_bytes_
-from server.app.services.wordpress.meta.meta_content import get_existing_meta_, update_meta_yoast_
-from server.app.services.wordpress.meta.author import find_author_id_
-from server.app.services.wordpress.cpt.crud import create_cpt_
+from server.app.services.wordpress.media.crud import delete_media_, get_media_, replace_media_, upload_media_file_, upload_media_from_bytes_
+from server.app.services.wordpress.media.inventory import delete_medias_, iter_media_, list_media_, purge_media_, replace_medias_, verify_media_files_, verify_media_index_
+from server.app.services.wordpress.meta.meta_content import get_existing_meta_, update_meta_yoast_, update_post_meta_
+from server.app.services.wordpress.meta.author import find_author_id_, find_term_id_
+from server.app.services.wordpress.meta.directory import get_directory_
+from server.app.services.wordpress.cpt.crud import apply_upsert_, create_cpt_, find_posts_by_slugs_, plan_upsert_, send_plan_, update_cpt_, upsert_cpt_
+from server.app.services.wordpress.batch import WordpressBatch, upsert_cpts_
+from server.app.services.wordpress.session import get_session
 
 import logging
+import os
 # ================= FUNCTIONS ==================
 
 # Check Post Type Endpoint
@@ -15,7 +20,7 @@ import logging
 
 class WordpressHelper:
 
-    def __init__(self, creds):
+    def __init__(self, creds, meta_mode: str | None = None):
 
         self.app_user = creds.get('KEY').strip()
         self.app_pass = creds.get('SECRET').strip()
@@ -24,6 +29,10 @@ class WordpressHelper:
             self.domain += "/"
 
         self.url = f"{self.domain}wp-json/wp/v2"
+        # Pooled keep-alive connections (shared per site) with default connect/read timeouts
+        self.session = get_session(self.domain)
+        # "inline": meta goes in the create request; "separate": follow-up meta update
+        self.meta_mode = (meta_mode or creds.get("META_MODE") or os.getenv("WP_META_MODE") or "inline").strip().lower()
 
         creds_str = f"{self.app_user}:{self.app_pass}"
         token = base64.b64encode(creds_str.encode())
@@ -41,7 +50,7 @@ class WordpressHelper:
     def test_connection(self):
         endpoint = f"{self.url}/users/me"
         try:
-            response = requests.get(endpoint, headers=self.header)
+            response = self.session.get(endpoint, headers=self.header)
             if response.status_code == 200:
                 # print("Connection to WordPress API successful.")
                 return True
@@ -59,7 +68,7 @@ class WordpressHelper:
             url = f"{self.url}/{endpoint}"
 
         try:
-            response = requests.get(url, headers=self.header)
+            response = self.session.get(url, headers=self.header)
             print(f"Status Code: {response.status_code}")
             try:
                 return response.json()
@@ -76,18 +85,39 @@ class WordpressHelper:
 
     def upload_media_from_bytes( self, img_bytes: bytes, filename: str, mime: str = "image/png", title: str | None = None, alt_text: str | None = None) -> int:
         return upload_media_from_bytes_(self, img_bytes, filename, mime, title, alt_text)
+
+    def upload_media_file(self, file_path: str, filename: str | None = None, mime: str | None = None, title: str | None = None, alt_text: str | None = None, optimise: bool = True, dedupe: bool = True) -> int:
+        return upload_media_file_(self, file_path, filename, mime, title, alt_text, optimise, dedupe)
     
-    # def delete_media(self, id):
-    #     return delete_media_(self, id)
+    def delete_media(self, id):
+        return delete_media_(self, id)
         
-    # def delete_all_media(self):
-    #     return delete_medias_(self)
+    def delete_all_media(self):
+        return delete_medias_(self)
+
+    def get_media_by_id(self, media_id):
+        return get_media_(self, media_id)
+
+    def replace_media(self, media_id, file_path):
+        return replace_media_(self, media_id, file_path)
+
+    def iter_media(self, fields: str = "id", params: dict | None = None, workers: int | None = None):
+        return iter_media_(self, fields, params, workers)
+
+    def list_media(self, fields: str = "id", params: dict | None = None, workers: int | None = None) -> list:
+        return list_media_(self, fields, params, workers)
 
-    # def get_media_by_id(self, media_id):
-    #     return get_media_(self, media_id)
+    def purge_media(self, ids=None, params: dict | None = None, workers: int | None = None, progress=None, max_rounds: int = 3) -> dict:
+        return purge_media_(self, ids, params, workers, progress, max_rounds)
 
-    # def replace_media(self, media_id, file_path):
-    #     return replace_media_(self, media_id, file_path)
+    def replace_medias(self, replacements: dict, workers: int | None = None, progress=None) -> dict:
+        return replace_medias_(self, replacements, workers, progress)
+
+    def verify_media_index(self, ids=None, workers: int | None = None) -> dict:
+        return verify_media_index_(self, ids, workers)
+
+    def verify_media_files(self, paths, workers: int | None = None) -> dict:
+        return verify_media_files_(self, paths, workers)
             
     # =================================
     # ============= META ==============
@@ -98,15 +128,52 @@ class WordpressHelper:
     def update_meta_yoast(self, rest_base: str, post_id: int, meta_description: str | None, meta_title: str | None):
         return update_meta_yoast_(self, rest_base, post_id, meta_description, meta_title)
 
+    def update_post_meta(self, rest_base: str, post_id: int, meta: dict):
+        return update_post_meta_(self, rest_base, post_id, meta)
+
     def find_author_id(self, name: str):
         return find_author_id_(self, name)
+
+    def find_category_id(self, name: str):
+        return find_term_id_(self, "categories", name)
+
+    def find_tag_id(self, name: str):
+        return find_term_id_(self, "tags", name)
+
+    def load_directory(self, kind: str, refresh: bool = False) -> dict:
+        """Bulk-load (or refresh) the cached users/categories/tags index for this site."""
+        return get_directory_(self, kind, refresh)
     
     # =================================
     # ============= CPT's =============
     # =================================
     
-    def create_cpt(self, rest_base: str, payload: dict) -> dict:
-        return create_cpt_(self, rest_base, payload)
+    def create_cpt(self, rest_base: str, payload: dict, meta_mode: str | None = None) -> dict:
+        return create_cpt_(self, rest_base, payload, meta_mode)
+
+    def update_cpt(self, rest_base: str, post_id: int, payload: dict) -> dict:
+        return update_cpt_(self, rest_base, post_id, payload)
+
+    def upsert_cpt(self, rest_base: str, payload: dict, meta_mode: str | None = None) -> dict:
+        return upsert_cpt_(self, rest_base, payload, meta_mode)
+
+    def find_posts_by_slugs(self, rest_base: str, slugs, refresh: bool = False) -> dict:
+        return find_posts_by_slugs_(self, rest_base, slugs, refresh)
+
+    def upsert_cpts(self, rest_base: str, payloads: dict, existing: dict | None = None, meta_mode: str | None = None) -> dict:
+        return upsert_cpts_(self, rest_base, payloads, existing, meta_mode)
+
+    def plan_upsert(self, rest_base: str, payload: dict, meta_mode: str | None = None, existing=False) -> dict:
+        return plan_upsert_(self, rest_base, payload, meta_mode, existing)
+
+    def send_plan(self, plan: dict):
+        return send_plan_(self, plan)
+
+    def apply_upsert(self, plan: dict, status: int, body) -> dict:
+        return apply_upsert_(self, plan, status, body)
+
+    def batch(self, size: int = 25) -> WordpressBatch:
+        return WordpressBatch(self, size)
     
 # ================= MAIN ==================
 if __name__ == "__main__":
@@ -1,11 +1,27 @@
 # server/app/utils/clients/georges_cameras/collection_page.py
-from bs4 import BeautifulSoup
-import os
-from server.app.utils.formatters.extraction import extract_handle, extract_slug
-from server.config.ConfigHelper import ConfigHelper
+import threading
+from server.app.utils.formatters.extraction import extract_slug
+from server.app.utils.formatters.parsing import parse_fragment
 from server.app.utils.debugging.console_logging import log_error, log_info
 from server.app.services.wordpress.wordpress import WordpressHelper
-from server.app.services.open_ai.open_ai import OpenAIHelper
+from server.app.services.open_ai.prompts import get_prompt
+
+ENDPOINT = "learn"
+
+# Static instructions first, per-page details last (keeps the shared prefix cacheable)
+PROMPTS = {
+    "featuredImage": {
+        "model": "dall-e-3",
+        "instructions": (
+            "Generate a featured blog image for my crypto market news site. The image should be:"
+            "- 1:1."
+            "- Futuristic"
+            "- Contain no words"
+            "- Use https://cryptomarketnews.com.au/wp-content/uploads/2025/11/Crpyto-Market-News-1-3.webp as an example"
+        ),
+        "input": "- Be relevent to the title: {heading}",
+    },
+}
 
 MANIFEST = {
   "version": "1.0",
@@ -47,7 +63,7 @@ def format_page(page: dict) -> dict:
     """
 
     html = page.get("pageBody") or ""
-    soup = BeautifulSoup(html, "html.parser")
+    soup = parse_fragment(html)
 
     h1 = soup.find("h1")
     body_content = ""
@@ -60,7 +76,7 @@ def format_page(page: dict) -> dict:
         body_content = "".join(chunks).strip()
     else:
         # fallback if no H1 – use full body
-        body_content = str(soup) if soup else html
+        body_content = soup.decode_contents() if soup else html
 
     return (
         {
@@ -122,94 +138,192 @@ def format_csv(page: dict):
     return [row]
 
 
-def upload_page(page: dict):
+def _gpt():
+    # Imported on first upload so format_page works without OpenAI/config installed
+    from server.app.services.open_ai.open_ai import OpenAIHelper
+    return OpenAIHelper()
+
+
+def _image_job(gpt, heading):
+    # Shared per prompt: cached file, the job started at parse time, or a new one
+    template = get_prompt("featuredImage", "crypto_market_news", "learn")
+    return gpt.image_job(prompt=template.text(heading=heading), model=template.model, size="1024x1024")
+
+
+def _wordpress() -> WordpressHelper:
+    from server.config.ConfigHelper import ConfigHelper
+
     # UPLOAD CREDS: {'URL': 'xxx', 'WP_KEY': 'xxx', 'WP_SECRET': 'xxx'}
-    log_info("Starting Page Upload...")
     raw_creds = ConfigHelper.get_client_env("CRYPTO_MARKET_NEWS")
     creds = {"KEY": raw_creds.get("WP_KEY"), "SECRET": raw_creds.get("WP_SECRET"), "URL": raw_creds.get("URL")}
-    endpoint = "learn"
-    gpt = OpenAIHelper()
+    return WordpressHelper(creds)
+
+
+def _page_slug(page: dict) -> str:
+    page_url = page.get("pageUrl") or (page.get("data") or {}).get("pageUrl") or ""
+    if not page_url:
+        return ""
+    try:
+        return extract_slug(page_url) or ""
+    except Exception:
+        return ""
+
+
+def _prepare(pages: list):
+    existing = {}
+    try:
+        existing = _wordpress().find_posts_by_slugs(ENDPOINT, [_page_slug(p) for p in pages], refresh=True)
+    except Exception as e:
+        log_error(e)
+
+    gpt = _gpt()
+    for page in pages:
+        heading = (page.get("data") or {}).get("pageHeading")
+        post = existing.get(_page_slug(page))
+        if heading and not (post and post.get("featured_media")):
+            _image_job(gpt, heading)
+
+
+def prepare_uploads(pages: list):
+    """
+    Called with formatted pages as soon as they are parsed (and again before
+    upload). Returns immediately: a background thread resolves every page's
+    slug against the site in one lookup, then starts featured images for
+    pages that don't already have one, so the result is cached or in flight
+    by the time upload_page needs it.
+    """
+    pages = list(pages or [])
+    if pages:
+        threading.Thread(target=_prepare, args=(pages,), name="learn-prepare", daemon=True).start()
+
+
+def _build_payload(wp: WordpressHelper, page: dict, img=None) -> dict:
+    """Post payload for a page; uploads the generated featured image (if any) on the way."""
+    data = page['data']
+    slug = _page_slug(page)
+    heading = data.get('pageHeading')
+
+    payload = {
+      "title": heading,
+      "slug": slug,
+      "status": "draft",
+      "content": data.get('body_content'),
+      "meta_title": data.get('metaTitle'),
+      "meta_description": data.get('metaDescription'),
+    }
+
+    log_info("Finding Author...")
+    author_name = data.get("author") or None
+    author_id = wp.find_author_id(author_name)
+    if author_id:
+        payload["author"] = author_id
+
+    if img and img.get("path"):
+        try:
+            filename = f"{slug}.png"
+            log_info("Uploading Image...")
+            # Resized + re-encoded (WebP by default) and streamed from disk
+            media_id = wp.upload_media_file(
+                file_path=img["path"],
+                filename=filename,
+                title=heading or slug,
+                alt_text=heading or slug,
+            )
+
+            # Attach as featured image
+            payload["featured_media"] = media_id
+        except Exception as me:
+            log_error(me)
+
+    return payload
+
+
+def upload_page(page: dict):
+    log_info("Starting Page Upload...")
+    gpt = _gpt()
 
 
     try:
         log_info("Formatting Data...")
         data = page['data']
-        wp = WordpressHelper(creds)
+        wp = _wordpress()
         # 3) Smoke test: can we hit the API root?
         if not wp.test_connection():
             return "Failed WordPress API connection"
         
-        page_url = page.get("pageUrl") or ""
-        slug = ""
-        if page_url:
-            try:
-                slug = extract_slug(page_url) or ""
-            except Exception:
-                slug = ""
-
-        payload = {
-          "title": data.get('pageHeading'),
-          "slug": slug,
-          "status": "draft",
-          "content": data.get('body_content'),
-          "meta_title": data.get('metaTitle'),
-          "meta_description": data.get('metaDescription'),
-        }
-
-        log_info("Finding Author...")
-        author_name = data.get("author") or None
-        author_id = wp.find_author_id(author_name)
-        if author_id:
-            payload["author"] = author_id
-
-        log_info("Generating Image...")
-        heading = data.get('pageHeading')
-        img_prompt = (
-              "Generate a featured blog image for my crypto market news site. The image should be:"
-              "- 1:1."
-              "- Futuristic"
-              "- Contain no words"
-              f"- Be relevent to the title: {heading}"
-              "- Use https://cryptomarketnews.com.au/wp-content/uploads/2025/11/Crpyto-Market-News-1-3.webp as an example"
-          )
-        img = gpt.generate_image(prompt=img_prompt, model="dall-e-3", size="1024x1024")
-
-        if img and img.get("bytes"):
-            try:
-                filename = f"{slug}.png"
-                log_info("Uploading Image...")
-                media_id = wp.upload_media_from_bytes(
-                    img_bytes=img["bytes"],
-                    filename=filename,
-                    mime=img.get("mime", "image/png"),
-                    title=heading or slug,
-                    alt_text=heading or slug,
-                )
-
-                # Attach as featured image
-                payload["featured_media"] = media_id
-            except Exception as me:
-                log_error(me)
-
-        # 6) Finally create the CPT entry
+        slug = _page_slug(page)
+
+        # Existing post (usually already resolved in bulk by prepare_uploads)
+        existing = wp.find_posts_by_slugs(ENDPOINT, [slug]).get(slug) if slug else None
+        needs_image = not (existing and existing.get("featured_media"))
+        # Start the featured image now; it generates while we talk to WordPress
+        img_job = _image_job(gpt, data.get('pageHeading')) if needs_image else None
+
+        img = None
+        if img_job is not None:
+            log_info("Generating Image...")
+            img = gpt.gather([img_job])[0]
+
+        payload = _build_payload(wp, page, img)
+
+        # 6) Finally create the CPT entry, or update only what changed on the existing one
         log_info("Uploading Page...")
-        wp.create_cpt(endpoint, payload)
+        result = wp.upsert_cpt(ENDPOINT, payload)
+        log_info(f"Page {result['action']}: {slug or result.get('id')}")
         
         return True
 
     except Exception as e:
         # This will be shown in the upload summary’s "error" field
         return f"Upload error: {e}"
-    
-    
-
 
 
-    # return True for success
-    # return failure_message for fail
-    # wp.upload_custom_post_type("endpoint", payload)               # create
-    # wp.upload_custom_post_type("endpoint", payload, post_id)      # update ID 123
-
+def upload_pages(pages: list) -> list:
+    """
+    Upload a whole group: one connection test, one slug lookup, images in
+    parallel, then the post writes go out through the batch API (25 per
+    request). Returns one status per page, in order (True or an error string).
+    """
+    log_info(f"Starting Upload of {len(pages)} Pages...")
+    gpt = _gpt()
 
-    # ENDPOINT = learn
-    # post_id = 123
\ No newline at end of file
+    try:
+        wp = _wordpress()
+        if not wp.test_connection():
+            return ["Failed WordPress API connection"] * len(pages)
+        existing = wp.find_posts_by_slugs(ENDPOINT, [_page_slug(p) for p in pages])
+    except Exception as e:
+        return [f"Upload error: {e}"] * len(pages)
+
+    # Every needed image at once (most were started by prepare_uploads)
+    jobs = {}
+    for i, page in enumerate(pages):
+        post = existing.get(_page_slug(page))
+        heading = (page.get("data") or {}).get("pageHeading")
+        if heading and not (post and post.get("featured_media")):
+            jobs[i] = _image_job(gpt, heading)
+    log_info("Generating Images...")
+    images = dict(zip(jobs, gpt.gather(list(jobs.values())))) if jobs else {}
+    if images:
+        # Uploads reuse already-uploaded identical images: check just those still exist
+        try:
+            wp.verify_media_files([img["path"] for img in images.values() if img and img.get("path")])
+        except Exception as e:
+            log_error(e)
+
+    statuses = [None] * len(pages)
+    payloads = {}
+    for i, page in enumerate(pages):
+        try:
+            payloads[i] = _build_payload(wp, page, images.get(i))
+        except Exception as e:
+            statuses[i] = f"Upload error: {e}"
+
+    log_info("Uploading Pages...")
+    for i, result in wp.upsert_cpts(ENDPOINT, payloads, existing=existing).items():
+        if isinstance(result, Exception):
+            statuses[i] = f"Upload error: {result}"
+        else:
+            log_info(f"Page {result['action']}: {_page_slug(pages[i]) or result.get('id')}")
+            statuses[i] = True
+    return statuses
@@ -1,8 +1,7 @@
 # server/app/utils/clients/georges_cameras/collection_page.py
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 import json
-from server.app.utils.formatters.parsing import html_to_richtext
+from server.app.utils.formatters.parsing import html_to_richtext, parse_fragment
 from server.app.utils.formatters.shopify_data import format_faqs
 
 def _extract_handle(url: str) -> str:
@@ -101,7 +100,7 @@ def format_page(page: dict) -> dict:
     Return any structure you want your pipeline to use next.
     """
     html = page.get("pageBody") or ""
-    soup = BeautifulSoup(html, "html.parser")
+    soup = parse_fragment(html)
 
     h1 = soup.find("h1")
     top_html = ""
@@ -183,7 +182,7 @@ def format_page(page: dict) -> dict:
     bottom_content_hidden = ""
 
     if bottom_html:
-        bottom_soup = BeautifulSoup(bottom_html, "html.parser")
+        bottom_soup = parse_fragment(bottom_html)
         children = list(bottom_soup.children)
 
         words_so_far = 0
@@ -0,0 +1,145 @@
+import html
+from typing import Optional
+
+
+def flatten_text(doc: dict) -> str:
+    chunks = []
+    for el in doc.get("body", {}).get("content", []):
+        p = el.get("paragraph")
+        if not p:
+            continue
+        for e in p.get("elements", []):
+            tr = e.get("textRun")
+            if tr and "content" in tr:
+                chunks.append(tr["content"])
+    return "".join(chunks).strip()
+
+
+def render_html(doc: dict, content: Optional[list] = None) -> str:
+    """
+    Render `content` (a slice of doc.body.content; defaults to the whole body)
+    using the document's list definitions.
+
+    Minimal-but-meaningful HTML renderer:
+    - Headings (HEADING_1..HEADING_6) -> <h1>.. <h6>
+    - Normal paragraphs -> <p>
+    - Lists -> <ul>/<ol>/<li> (using doc.lists to tell ordered vs bullet)
+    - Inline styles: bold, italic, underline, strikethrough, link
+    """
+    lists_meta = doc.get("lists", {}) or {}
+    if content is None:
+        body = doc.get("body", {}) or {}
+        content = body.get("content", []) or []
+
+    html_out = []
+    open_list_stack = []  # stack of ('ul'|'ol')
+    current_list_id = None
+
+    def close_all_lists():
+        nonlocal open_list_stack, html_out, current_list_id
+        while open_list_stack:
+            tag = open_list_stack.pop()
+            html_out.append(f"</{tag}>")
+        current_list_id = None
+
+    def ensure_list(list_id: str, nesting_level: int):
+        """Open/close <ul>/<ol> tags so that nesting matches the paragraph nesting level."""
+        nonlocal open_list_stack, html_out, current_list_id
+        list_def = lists_meta.get(list_id, {})
+        nesting = list_def.get("listProperties", {}).get("nestingLevels", [])
+        # heuristic: presence of glyphType suggests ordered list
+        ordered = False
+        if nesting and nesting_level < len(nesting):
+            ordered = bool(nesting[nesting_level].get("glyphType"))
+        # If Docs didn’t specify, default to unordered
+        tag = "ol" if ordered else "ul"
+
+        # if we’re switching lists (new list_id), close all prior
+        if current_list_id != list_id:
+            close_all_lists()
+            current_list_id = list_id
+
+        # adjust nesting depth
+        depth = len(open_list_stack)
+        while depth < (nesting_level + 1):
+            html_out.append(f"<{tag}>")
+            open_list_stack.append(tag)
+            depth += 1
+        while depth > (nesting_level + 1):
+            last = open_list_stack.pop()
+            html_out.append(f"</{last}>")
+            depth -= 1
+
+    def render_inline(elements: list) -> str:
+        parts = []
+        for el in elements or []:
+            tr = el.get("textRun")
+            if not tr:
+                continue
+            text = tr.get("content", "")
+            if not text:
+                continue
+            tstyle = tr.get("textStyle", {}) or {}
+            esc = html.escape(text, quote=False)
+
+            # link
+            link = (tstyle.get("link") or {}).get("url")
+            # inline formatting
+            if tstyle.get("bold"):
+                esc = f"<strong>{esc}</strong>"
+            if tstyle.get("italic"):
+                esc = f"<em>{esc}</em>"
+            if tstyle.get("underline"):
+                esc = f"<u>{esc}</u>"
+            if tstyle.get("strikethrough"):
+                esc = f"<s>{esc}</s>"
+
+            if link:
+                esc = f'<a href="{html.escape(link)}" target="_blank" rel="noopener noreferrer">{esc}</a>'
+            parts.append(esc)
+        return "".join(parts)
+
+    for block in content:
+        para = block.get("paragraph")
+        if not para:
+            # Ignore tables/images for now (can extend later)
+            continue
+
+        pstyle = (para.get("paragraphStyle") or {}).get("namedStyleType", "")
+        bullet = para.get("bullet")
+        elements = para.get("elements", [])
+
+        if bullet:
+            # list item
+            list_id = bullet.get("listId")
+            nesting_level = int(bullet.get("nestingLevel", 0))
+            ensure_list(list_id, nesting_level)
+            inner = render_inline(elements).rstrip("\n")
+            html_out.append(f"<li>{inner}</li>")
+            continue  # don’t close lists yet
+
+        # non-list paragraph → close any open lists
+        if open_list_stack:
+            close_all_lists()
+
+        # headings vs paragraph
+        tag = "p"
+        if pstyle.startswith("HEADING_"):
+            # map HEADING_1..6 -> h1..h6
+            try:
+                level = int(pstyle.split("_")[1])
+                if 1 <= level <= 6:
+                    tag = f"h{level}"
+            except Exception:
+                tag = "h2"
+        inner = render_inline(elements).rstrip("\n")
+        # skip empty trailing paragraph the API often gives
+        if not inner.strip():
+            continue
+        html_out.append(f"<{tag}>{inner}</{tag}>")
+
+    # close any lists left open
+    if open_list_stack:
+        close_all_lists()
+
+    return "".join(html_out)
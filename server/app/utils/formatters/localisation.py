@@ -3,38 +3,112 @@ import re
 
 # ================= CONSTANTS ==================
 
+# US -> AU spelling. AU is the base table; UK/NZ only list where they differ.
+AU_SPELLING = {
+    'color': 'colour', 'optimize': 'optimise', 'behavior': 'behaviour', 'humor': 'humour',
+    'realize': 'realise', 'prioritize': 'prioritise', 'analyze': 'analyse', 'organize': 'organise',
+    'theater': 'theatre', 'meter': 'metre', 'center': 'centre', 'fulfill': 'fulfil',
+    'enroll': 'enrol', 'installment': 'instalment', 'traveled': 'travelled', 'traveling': 'travelling',
+    'labeled': 'labelled', 'labeling': 'labelling', 'modeled': 'modelled', 'modeling': 'modelling',
+    'revolutionized': 'revolutionised', 'customized': 'customised', 'favor': 'favour',
+    'honor': 'honour', 'jewelry': 'jewellery', 'defense': 'defence', 'license': 'licence',
+    'maximize': 'maximise', 'specialized': 'specialised', 'stabilize': 'stabilise',
+    'organization': 'organisation', "catalog": "catalogue", "gray": "grey", "favorite": "favourite",
+    'organizing': 'organising', 'coloring': 'colouring', 'colorful': 'colourful', 'optimization': 'optimisation',
+    'behaviors': 'behaviours', 'humorists': 'humourists', 'realization': 'realisation',
+    'prioritization': 'prioritisation',
+    'theatergoer': 'theatregoer', 'theaters': 'theatres', 'centers': 'centres',
+    'fulfillment': 'fulfilment', 'installments': 'instalments', 'traveler': 'traveller',
+    'favoring': 'favouring', 'jewelers': 'jewellers',
+    'licenses': 'licences', 'specializations': 'specialisations', 'stabilized': 'stabilised',
+    'organizational': 'organisational', 'cataloging': 'cataloguing', 'grayish': 'greyish', 'favorable': 'favourable',
+}
+
+LOCALE_SPELLING = {
+    "au": AU_SPELLING,
+    "uk": {**AU_SPELLING, 'program': 'programme', 'programs': 'programmes'},
+    "nz": {**AU_SPELLING, 'program': 'programme', 'programs': 'programmes'},
+}
+
+# Spans that are copied through untouched: script/style blocks, comments, tags
+# (so attributes never change) and bare URLs in text.
+_PROTECTED = (
+    r"<(?:script|style)\b[^>]*>.*?</(?:script|style)\s*>"
+    r"|<!--.*?-->"
+    r"|<[A-Za-z/!][^>]*>"
+    r"|(?:https?://|www\.)[^\s<>\"']+"
+)
+
+# Compiled matcher per locale: {locale: re.Pattern}
+_COMPILED = {}
+
 
 # ================= FUNCTIONS ==================
 def capitalize_words(text):
-    if not text is None: 
+    if not text is None:
         return ' '.join(word.capitalize() for word in text.split())
     return None
 
+def _trie_regex(node: dict) -> str:
+    """Turn a character trie into a compact regex (shared prefixes are matched once)."""
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # a word ends here but longer ones continue; greedy so the longest wins
+        body = f"(?:{body})?"
+    return body
+
+def _compile_locale(locale: str):
+    pattern = _COMPILED.get(locale)
+    if pattern is not None:
+        return pattern
+
+    table = LOCALE_SPELLING.get(locale)
+    if table is None:
+        raise ValueError(f"Unsupported locale: {locale!r}")
+
+    trie = {}
+    for word in table:
+        node = trie
+        for ch in word.lower():
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    pattern = re.compile(
+        rf"(?P<skip>{_PROTECTED})|\b(?P<word>{_trie_regex(trie)})\b",
+        re.IGNORECASE | re.DOTALL,
+    )
+    _COMPILED[locale] = pattern
+    return pattern
+
+def _match_case(src: str, repl: str) -> str:
+    if len(src) > 1 and src.isupper():
+        return repl.upper()
+    if src[:1].isupper():
+        return repl[:1].upper() + repl[1:]
+    return repl
+
+def localize(text, locale="au"):
+    """
+    Single pass over `text` (plain text or HTML) swapping US spellings for the
+    locale's. Only text is rewritten: tags/attributes, script/style and URLs are
+    left alone. Original casing is kept (Color -> Colour, COLOR -> COLOUR).
+    """
+    if not text:
+        return text
+
+    table = LOCALE_SPELLING.get(locale)
+    pattern = _compile_locale(locale)
+
+    def repl(m):
+        word = m.group("word")
+        if word is None:
+            return m.group(0)
+        return _match_case(word, table[word.lower()])
+
+    return pattern.sub(repl, text)
+
 def localize_au(text):
-        
-    AU_SPELLING = {
-        'color': 'colour', 'optimize': 'optimise', 'behavior': 'behaviour', 'humor': 'humour',
-        'realize': 'realise', 'prioritize': 'prioritise', 'analyze': 'analyse', 'organize': 'organise',
-        'theater': 'theatre', 'meter': 'metre', 'center': 'centre', 'fulfill': 'fulfil',
-        'enroll': 'enrol', 'installment': 'instalment', 'traveled': 'travelled', 'traveling': 'travelling',
-        'labeled': 'labelled', 'labeling': 'labelling', 'modeled': 'modelled', 'modeling': 'modelling',
-        'revolutionized': 'revolutionised', 'customized': 'customised', 'favor': 'favour',
-        'honor': 'honour', 'jewelry': 'jewellery', 'defense': 'defence', 'license': 'licence',
-        'maximize': 'maximise', 'specialized': 'specialised', 'stabilize': 'stabilise',
-        'organization': 'organisation', "catalog": "catalogue", "gray": "grey", "favorite": "favourite",
-        'organizing': 'organising', 'colouring': 'colouring', 'colourful': 'colourful', 'optimization': 'optimisation', 
-        'behaviors': 'behaviours', 'humorists': 'humourists', 'realization': 'realisation', 'organizing': 'organising',
-        'prioritization': 'prioritisation', 'analysis': 'analyses', 'organisation': 'organisation',
-        'theatergoer': 'theatregoer', 'theaters': 'theatres', 'metre': 'metre', 'centers': 'centres',
-        'fulfilling': 'fulfilling', 'fulfilment': 'fulfilment', 'enrolled': 'enrolled', 'installments': 'instalments',
-        'traveled': 'travelled', 'traveller': 'traveller', 'labeled': 'labelled', 'labelling': 'labelling',
-        'modeled': 'modelled', 'modeling': 'modelling', 'revolutionized': 'revolutionised', 'customized': 'customised',
-        'favoring': 'favouring', 'honorary': 'honourary', 'jewelers': 'jewellers', 'defensive': 'defensive',
-        'licenses': 'licences', 'maximize': 'maximise', 'specializations': 'specialisations', 'stabilized': 'stabilised',
-        'organizational': 'organisational', 'cataloging': 'cataloguing', 'grayish': 'greyish', 'favorable': 'favourable',
-    }
-
-    for us_spelling, au_spelling in AU_SPELLING.items():
-        # Use regex for case-insensitive replacements while maintaining original casing
-        text = re.sub(rf'\b{us_spelling}\b', au_spelling, text, flags=re.IGNORECASE)
-    return text
\ No newline at end of file
+    return localize(text, "au")
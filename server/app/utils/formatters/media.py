@@ -0,0 +1,109 @@
+# ================= IMPORTS ==================
+import base64
+import logging
+import mimetypes
+import os
+import tempfile
+from typing import Optional, Tuple
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is optional: without it images upload untouched
+    Image = None
+    features = None
+
+log = logging.getLogger(__name__)
+
+# ================= CONSTANTS ==================
+_DEFAULT_SPOOL = os.path.join(tempfile.gettempdir(), "streamline_media_spool")
+_B64_CHUNK = 4 * 64 * 1024  # multiple of 4 so every slice decodes on its own
+_FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "avif": ("AVIF", "image/avif", ".avif"),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+}
+
+
+# ================= FUNCTIONS ==================
+def spool_dir() -> str:
+    """Scratch directory for decoded/transcoded media (MEDIA_SPOOL_DIR)."""
+    path = os.getenv("MEDIA_SPOOL_DIR") or _DEFAULT_SPOOL
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spool_file(suffix: str = "") -> str:
+    fd, path = tempfile.mkstemp(dir=spool_dir(), suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def decode_b64_to_file(b64_data: str, suffix: str = ".png") -> str:
+    """Decode base64 straight into a spool file, a slice at a time (no full decoded copy in memory)."""
+    path = spool_file(suffix)
+    try:
+        with open(path, "wb") as f:
+            for i in range(0, len(b64_data), _B64_CHUNK):
+                f.write(base64.b64decode(b64_data[i:i + _B64_CHUNK]))
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def guess_mime(path: str, default: str = "application/octet-stream") -> str:
+    return mimetypes.guess_type(path)[0] or default
+
+
+def _settings() -> Tuple[str, int, int]:
+    fmt = (os.getenv("MEDIA_FORMAT") or "webp").strip().lower()
+    max_size = int(os.getenv("MEDIA_MAX_SIZE") or 1024)
+    quality = int(os.getenv("MEDIA_QUALITY") or 80)
+    return fmt, max_size, quality
+
+
+def transcode(path: str, fmt: Optional[str] = None, max_size: Optional[int] = None,
+              quality: Optional[int] = None) -> Tuple[str, str, bool]:
+    """
+    Resize (longest edge <= max_size) and re-encode an image into a new spool file.
+
+    Env defaults: MEDIA_FORMAT (webp | avif | jpeg | original), MEDIA_MAX_SIZE (px),
+    MEDIA_QUALITY (1-100).
+
+    Returns (path, mime, is_temp). When Pillow or the codec is unavailable, or
+    fmt is "original", the source file is returned untouched (is_temp=False).
+    """
+    env_fmt, env_size, env_quality = _settings()
+    fmt = (fmt or env_fmt).lower()
+    max_size = max_size or env_size
+    quality = quality or env_quality
+
+    if fmt == "original" or fmt not in _FORMATS or Image is None:
+        return path, guess_mime(path), False
+
+    pil_format, mime, ext = _FORMATS[fmt]
+    if fmt in ("webp", "avif") and not features.check(fmt):
+        log.warning("Pillow has no %s support; uploading original", fmt)
+        return path, guess_mime(path), False
+
+    out = spool_file(ext)
+    try:
+        with Image.open(path) as im:
+            im.draft("RGB", (max_size, max_size))  # cheap JPEG downscale on decode
+            if max(im.size) > max_size:
+                im.thumbnail((max_size, max_size), Image.LANCZOS)
+            if pil_format == "JPEG" and im.mode not in ("RGB", "L"):
+                im = im.convert("RGB")
+            im.save(out, pil_format, quality=quality)
+    except Exception as e:
+        os.remove(out)
+        log.warning("Transcode of %s failed (%s); uploading original", path, e)
+        return path, guess_mime(path), False
+
+    return out, mime, True
+
+
+def with_extension(filename: str, path: str) -> str:
+    """filename with its extension swapped for the one `path` actually has."""
+    stem = os.path.splitext(filename)[0] or "image"
+    return stem + os.path.splitext(path)[1]
@@ -1,10 +1,128 @@
 import re
-import json
-from urllib.parse import urlparse
-from bs4 import BeautifulSoup, NavigableString
+import os
+import logging
+import importlib.util
+from typing import Optional
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+log = logging.getLogger(__name__)
 
 _DOC_ID_RE = re.compile(r"/document/d/([a-zA-Z0-9-_]+)")
 
+# BeautifulSoup backends we know about -> module that must be importable (None = stdlib)
+_PARSER_MODULES = {"lxml": "lxml", "html5lib": "html5lib", "html.parser": None}
+# Auto-selection order, fastest first. html5lib is only used when configured explicitly.
+_PARSER_PREFERENCE = ("lxml", "html.parser")
+# Resolved backend (per process); override with HTML_PARSER=lxml|html5lib|html.parser
+_PARSER_CACHE = {}
+
+
+def _parser_available(name: str) -> bool:
+    if name not in _PARSER_MODULES:
+        return False
+    module = _PARSER_MODULES[name]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def get_html_parser() -> str:
+    """
+    Return the BeautifulSoup backend to use for this deployment.
+    Honours HTML_PARSER if it names an installed backend, otherwise picks the
+    fastest one available (lxml, falling back to the stdlib html.parser).
+    """
+    if "backend" in _PARSER_CACHE:
+        return _PARSER_CACHE["backend"]
+
+    backend = None
+    configured = (os.getenv("HTML_PARSER") or "").strip().lower()
+    if configured:
+        if _parser_available(configured):
+            backend = configured
+        else:
+            log.warning("HTML_PARSER=%r is not available; auto-selecting a backend.", configured)
+
+    if backend is None:
+        backend = next(name for name in _PARSER_PREFERENCE if _parser_available(name))
+
+    _PARSER_CACHE["backend"] = backend
+    return backend
+
+
+def make_soup(markup: Optional[str], parser: Optional[str] = None) -> BeautifulSoup:
+    """Parse a full HTML document with the configured backend."""
+    return BeautifulSoup(markup or "", parser or get_html_parser())
+
+
+def parse_fragment(markup: Optional[str], parser: Optional[str] = None) -> Tag:
+    """
+    Parse an HTML fragment (e.g. a pageBody) and return the node whose children are
+    the fragment's top-level nodes. lxml/html5lib wrap fragments in <html><body>,
+    html.parser doesn't, so callers should iterate this instead of the soup itself.
+
+    For those backends the fragment is given an explicit <body>: otherwise
+    leading bare text can be wrapped in an implied <p> (libxml2) and leading
+    whitespace/comments dropped, so the result would differ from html.parser.
+    """
+    parser = parser or get_html_parser()
+    if parser == "html.parser":
+        return make_soup(markup, parser)
+    soup = make_soup(f"<body>{markup or ''}</body>", parser)
+    return soup.body or soup
+
+def _attribute(formatter, key, value) -> str:
+    if value is None:
+        return key
+    if isinstance(value, (list, tuple)):
+        value = " ".join(value)
+    elif not isinstance(value, str):
+        value = str(value)
+    if "&" in value or "<" in value or ">" in value or '"' in value:
+        return f"{key}={formatter.quoted_attribute_value(formatter.attribute_value(value))}"
+    return f'{key}="{value}"'
+
+
+def _render_nodes(nodes, formatter, out: list, void_close: str) -> None:
+    for node in nodes:
+        kind = type(node)
+        if kind is NavigableString:
+            # substitution only changes & < >; skip it for the (common) plain strings
+            out.append(formatter.substitute(node) if ("&" in node or "<" in node or ">" in node) else str(node))
+        elif kind is Tag and not node.hidden and not node.prefix and node.name != "meta":
+            attrs = ""
+            if node.attrs:
+                attrs = " " + " ".join(_attribute(formatter, k, v) for k, v in formatter.attributes(node))
+            if node.contents:
+                out.append(f"<{node.name}{attrs}>")
+                _render_nodes(node.contents, formatter, out, void_close)
+                out.append(f"</{node.name}>")
+            elif node.can_be_empty_element is True:
+                out.append(f"<{node.name}{attrs}{void_close}>")
+            else:
+                out.append(f"<{node.name}{attrs}></{node.name}>")
+        elif isinstance(node, Tag):
+            # namespaced/hidden tags and <meta> (charset substitution): let bs4 render them
+            out.append(node.decode(formatter=formatter))
+        else:
+            # comments, CDATA, script/style strings, ...
+            out.append(node.output_ready(formatter))
+
+
+def render_nodes(nodes) -> str:
+    """
+    "".join(str(n) for n in nodes), byte for byte, in a fraction of the time:
+    bs4's generic serializer dominates page segmentation on long documents.
+    Uses the same "minimal" formatter, so escaping, quoting, attribute order
+    and void tags match; anything unusual is handed back to bs4.
+    """
+    nodes = list(nodes)
+    if not nodes:
+        return ""
+    formatter = nodes[0].formatter_for_name("minimal")
+    out = []
+    _render_nodes(nodes, formatter, out, formatter.void_element_close_prefix or "")
+    return "".join(out)
+
+
 def extract_doc_id(url: str) -> str:
     m = _DOC_ID_RE.search(url)
     if not m:
@@ -20,8 +138,7 @@ def html_to_richtext(html: str) -> dict:
       "children": [...]
     }
     """
-    html = html or ""
-    soup = BeautifulSoup(html, "html.parser")
+    root = parse_fragment(html)
     root_children = []
 
     def parse_inline_children(parent):
@@ -117,7 +234,7 @@ def html_to_richtext(html: str) -> dict:
             return None
         return {"type": "paragraph", "children": children}
 
-    for el in soup.contents:
+    for el in root.contents:
         # Skip pure whitespace
         if not getattr(el, "name", None) and not str(el).strip():
             continue
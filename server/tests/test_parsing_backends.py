@@ -0,0 +1,109 @@
+# server/tests/test_parsing_backends.py
+"""
+Conformance: page output must not depend on which BeautifulSoup backend
+get_html_parser() picks. Each test runs the same input under html.parser,
+lxml and html5lib (those installed) and expects identical results.
+"""
+import importlib
+import importlib.util
+
+import pytest
+
+from server.app.services.rest_api.interpret_page import main
+from server.app.utils.formatters import parsing
+
+BACKENDS = [b for b in ("html.parser", "lxml", "html5lib") if parsing._parser_available(b)]
+
+
+def _page(i: int) -> str:
+    body = "".join(
+        f'<p class="c1"><span>Paragraph {j} of page {i} with a <a href="https://x.com/{j}">link</a>.</span></p>'
+        for j in range(5)
+    )
+    return (
+        f'<p class="c5 title" id="h.{i}"><span class="c3">Page {i}</span></p>'
+        f'<p class="c1"><span>Page URL: </span><span><a href="https://www.google.com/url?q=https://acme.com/collections/p{i}&amp;sa=D">https://acme.com/collections/p{i}</a></span></p>'
+        f'<p class="c1"><span>Meta title: Title {i}</span></p>'
+        f'<p class="c1"><span>Meta description: Desc &amp; more {i}</span></p>'
+        f'<h1 class="c7"><span>Heading {i}</span></h1>'
+        f"{body}"
+        '<ul class="c2 lst"><li><span>one</span></li><li><span>two</span></li></ul>'
+        '<h2><span>More about it</span></h2><p><span>Bottom copy.</span></p>'
+        '<h2><span>FAQs</span></h2><h3><span>Is it good?</span></h3><p><span>Yes, very.</span></p>'
+        '<h3><span>Does it ship?</span></h3><p><span>Australia wide.</span></p>'
+    )
+
+
+DOC = (
+    '<html><head><style>.c1{}</style></head><body class="c12 doc-content">'
+    '<p class="c1"><span>Client Name: Acme Pty Ltd</span></p>'
+    '<p class="c1"><span>Client URL: </span><span><a href="https://www.google.com/url?q=https://acme.com&amp;sa=D">acme.com</a></span></p>'
+    '<p class="c1"><span>Number of Pages: </span><span>6</span></p>'
+    + "".join(_page(i) for i in range(1, 7))
+    + "</body></html>"
+)
+
+# Fragments whose top-level nodes differ between backends unless parse_fragment normalises them
+FRAGMENTS = [
+    "Leading bare text <b>bold</b><div>block</div>",
+    "  leading whitespace <p>para</p>",
+    "<!-- note -->text after a comment",
+    "\n<h1>Heading</h1>tail text",
+    "<p>one</p><p>two &amp; three</p>",
+]
+
+
+@pytest.fixture
+def use_backend(monkeypatch):
+    def _use(name):
+        monkeypatch.setitem(parsing._PARSER_CACHE, "backend", name)
+    return _use
+
+
+def _across_backends(use_backend, fn):
+    outputs = {}
+    for backend in BACKENDS:
+        use_backend(backend)
+        outputs[backend] = fn()
+    return outputs
+
+
+def _assert_identical(outputs):
+    reference = outputs["html.parser"]
+    for backend, output in outputs.items():
+        assert output == reference, f"{backend} output differs from html.parser"
+
+
+@pytest.mark.parametrize("markup", FRAGMENTS)
+def test_parse_fragment_top_level_nodes(use_backend, markup):
+    _assert_identical(_across_backends(use_backend, lambda: parsing.parse_fragment(markup).decode_contents()))
+
+
+@pytest.mark.parametrize("markup", FRAGMENTS)
+def test_html_to_richtext(use_backend, markup):
+    _assert_identical(_across_backends(use_backend, lambda: parsing.html_to_richtext(markup)))
+
+
+def test_interpret_page(use_backend):
+    _assert_identical(_across_backends(use_backend, lambda: main.interpret_page(DOC)))
+
+
+@pytest.mark.parametrize("module_path", [
+    "server.app.utils.clients.georges_cameras.collection",
+    "server.app.utils.clients.crypto_market_news.learn",
+])
+def test_format_page(use_backend, module_path):
+    formatter = importlib.import_module(module_path)
+
+    def run():
+        pages = main.interpret_page(DOC)["pages"]
+        return [formatter.format_page(page)[0] for page in pages]
+
+    _assert_identical(_across_backends(use_backend, run))
+
+
+def test_backends_under_test():
+    assert "html.parser" in BACKENDS
+    for optional in ("lxml", "html5lib"):
+        if importlib.util.find_spec(optional) is None:
+            pytest.skip(f"{optional} not installed; conformance checked without it")